@@ -4,11 +4,13 @@
 import re
 from dataclasses import dataclass
 from pathlib import Path
+from pathlib import PurePath
 
 from app.config import CHUNK_OVERLAP
 from app.config import CHUNK_SIZE
 from app.config import MIN_CHUNK_SIZE
 from app.extract import ExtractedDocument
+from app.extract import encode_relative_path
 from app.logging import get_logger
 
 log = get_logger(__name__)
@@ -408,7 +410,7 @@ def chunk_document(
     document: ExtractedDocument,
     source: str,
     document_version: str | None = None,
-    relative_path: Path | None = None,
+    relative_path: PurePath | None = None,
 ) -> list[Chunk]:
     """Chunk a document with full metadata.
 
@@ -427,6 +429,16 @@ def chunk_document(
     # Build page position map for the full document
     page_positions = _build_page_positions(document)
 
+    # Use encoded relative path in chunk_id to ensure uniqueness across
+    # subdirectories; it is the same for every chunk, so compute it once
+    if relative_path:
+        safe_filename = encode_relative_path(relative_path)
+        doc_path = str(relative_path)
+    else:
+        safe_filename = document.source_file
+        doc_path = document.source_file
+    chunk_id_prefix = f"{source}_{safe_filename}_"
+
     chunks: list[Chunk] = []
     chunk_index = 0
 
@@ -457,17 +469,9 @@ def chunk_document(
             )
             word_count = len(text.split())
 
-            # Use encoded relative path in chunk_id to ensure uniqueness across subdirectories
-            if relative_path:
-                safe_filename = str(relative_path).replace("/", "__")
-                doc_path = str(relative_path)
-            else:
-                safe_filename = document.source_file
-                doc_path = document.source_file
-
             chunk = Chunk(
                 text=text,
-                chunk_id=f"{source}_{safe_filename}_{chunk_index}",
+                chunk_id=f"{chunk_id_prefix}{chunk_index}",
                 source=source,
                 document_name=document.source_file,
                 document_path=doc_path,  # Relative path for unique identification
@@ -487,7 +491,7 @@ def chunk_document(
 
 def save_chunks_artifacts(
     chunks: list[Chunk],
-    document_identifier: str | Path,
+    document_identifier: str | PurePath,
     output_dir: Path,
 ) -> tuple[Path, Path]:
     """Save chunk artifacts for visibility into the chunking process.
@@ -510,19 +514,20 @@ def save_chunks_artifacts(
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Handle both string (legacy) and Path (subdirectory support)
+    # Handle both string (legacy) and path (subdirectory support)
     # Encode path with __ separator: Fees/doc.pdf -> Fees__doc
-    if isinstance(document_identifier, Path):
-        safe_name = str(document_identifier).replace("/", "__")
+    if isinstance(document_identifier, PurePath):
+        safe_name = encode_relative_path(document_identifier)
         base_name = Path(safe_name).stem
     else:
         base_name = Path(document_identifier).stem
 
     # Save chunks as JSONL (one chunk per line for easy inspection)
     chunks_path = output_dir / f"{base_name}.chunks.jsonl"
-    with chunks_path.open("w", encoding="utf-8") as f:
-        for chunk in chunks:
-            chunk_data = {
+    # Serialize every line first, then hand them to the file in one call
+    lines = [
+        json.dumps(
+            {
                 "chunk_id": chunk.chunk_id,
                 "chunk_index": chunk.chunk_index,
                 "section_heading": chunk.section_heading,
@@ -535,7 +540,12 @@ def save_chunks_artifacts(
                 else chunk.text,
                 "text": chunk.text,
             }
-            f.write(json.dumps(chunk_data) + "\n")
+        )
+        + "\n"
+        for chunk in chunks
+    ]
+    with chunks_path.open("w", encoding="utf-8") as f:
+        f.writelines(lines)
 
     # Save chunking summary metadata
     meta_path = output_dir / f"{base_name}.chunks.meta.json"
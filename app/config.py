@@ -52,6 +52,9 @@ MAX_CHUNKS_AFTER_RERANKING = 8  # Safety cap (balance: accuracy vs cost/context)
 RERANKING_TIMEOUT = 30  # Timeout in seconds per chunk scoring (prevents hangs)
 RERANKING_INCLUDE_EXPLANATIONS = False  # Include explanations (costs ~50% more tokens)
 RERANKING_ENABLED = True  # Enable LLM reranking by default
+RERANKING_CACHE_SIZE = 1024  # Scores kept for repeat (question, chunk) pairs
+RERANKING_BATCH_POLL_INTERVAL = 30  # Seconds between Batch API status checks
+RERANKING_BATCH_MAX_WAIT = 24 * 60 * 60  # Batch API completion window (24h)
 
 # Context Budget parameters (Phase 5)
 MAX_CONTEXT_TOKENS = (
@@ -0,0 +1,116 @@
+# app/discovery.py
+"""Recursive discovery of source documents under a provider's raw directory."""
+
+import os
+from collections.abc import Iterable
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from pathlib import PurePosixPath
+
+from app.logging import get_logger
+
+log = get_logger(__name__)
+
+# File types ingest_provider() can extract, lowercased for suffix matching
+SUPPORTED_EXTENSIONS = frozenset({".pdf", ".docx", ".txt"})
+
+
+@dataclass(slots=True, frozen=True)
+class DocumentFile:
+    """A discovered document and its path relative to the raw directory.
+
+    Attributes:
+        path: Absolute path to the document on disk.
+        relative_path: Path relative to the provider raw directory.
+        document_path: relative_path as a posix string, the document_path
+            value stored with each chunk.
+    """
+
+    path: Path
+    relative_path: PurePosixPath
+    document_path: str
+
+
+def _key_entry(
+    entry: os.DirEntry[str],
+    suffixes: tuple[str, ...],
+    keyed: list[tuple[str, str, str, bool]],
+) -> None:
+    """Append entry to keyed if it is a directory or a supported file.
+
+    Raises:
+        OSError: If the entry's type cannot be determined.
+    """
+    name = entry.name
+    if entry.is_dir(follow_symlinks=False):
+        keyed.append((name.lower() + "/", name, entry.path, True))
+        return
+    # Check the suffix before is_file(): most skipped entries never need
+    # their type. A name that is only a suffix (".pdf") is a hidden file
+    # with no suffix, as Path.suffix treats it.
+    lowered = name.lower()
+    if lowered.endswith(suffixes) and lowered not in suffixes and entry.is_file():
+        keyed.append((lowered, name, entry.path, False))
+
+
+def _walk_supported(
+    directory: str, prefix: str, suffixes: tuple[str, ...]
+) -> Iterator[tuple[str, str]]:
+    """Yield (relative posix path, path) for supported files in sorted order.
+
+    Siblings are visited in case-insensitive name order, with directories
+    keyed as "name/", so this pre-order walk yields files in the same order
+    as sorting their full lowercased relative paths. Only one directory's
+    entries are held at a time.
+
+    DirEntry caches the file type from the directory read, so no extra stat
+    is needed per entry. Symlinked directories are not followed (matching
+    Path.rglob); symlinked files are yielded like regular files. The relative
+    path is built from prefix during traversal rather than recomputed later.
+
+    A directory or entry that cannot be read (e.g., permission denied) is
+    logged and skipped, so one bad subdirectory does not abort discovery.
+    """
+    keyed: list[tuple[str, str, str, bool]] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    _key_entry(entry, suffixes, keyed)
+                except OSError as e:
+                    log.warning(
+                        "discovery_entry_unreadable", path=entry.path, error=str(e)
+                    )
+    except OSError as e:
+        log.warning("discovery_directory_unreadable", path=directory, error=str(e))
+        return
+    keyed.sort()
+
+    for _, name, path, is_dir in keyed:
+        if is_dir:
+            yield from _walk_supported(path, f"{prefix}{name}/", suffixes)
+        else:
+            yield prefix + name, path
+
+
+def find_document_files(
+    raw_dir: Path, extensions: Iterable[str] = SUPPORTED_EXTENSIONS
+) -> list[DocumentFile]:
+    """Find supported documents under raw_dir, including subdirectories.
+
+    The relative path of each file is computed once during the walk and
+    carried on its DocumentFile, so callers never call relative_to().
+
+    Args:
+        raw_dir: Provider raw documents directory to search.
+        extensions: Lowercase file suffixes to include (e.g., {".pdf"}).
+
+    Returns:
+        DocumentFiles sorted case-insensitively by relative path, so
+        ingestion order is deterministic across platforms.
+    """
+    return [
+        DocumentFile(Path(path), PurePosixPath(relative), relative)
+        for relative, path in _walk_supported(str(raw_dir), "", tuple(extensions))
+    ]
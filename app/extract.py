@@ -7,6 +7,7 @@ from dataclasses import dataclass
 from datetime import datetime
 from datetime import timezone
 from pathlib import Path
+from pathlib import PurePath
 
 import fitz
 from docx import Document
@@ -319,11 +320,24 @@ def detect_document_version(text: str) -> str | None:
     return None
 
 
+def encode_relative_path(relative_path: PurePath) -> str:
+    """Flatten a relative document path into a single artifact-safe name.
+
+    Args:
+        relative_path: Path relative to the source raw directory.
+
+    Returns:
+        The path with "/" replaced by "__" (e.g., "Fees/doc.pdf" ->
+        "Fees__doc.pdf"). Flat paths come back unchanged.
+    """
+    return str(relative_path).replace("/", "__")
+
+
 def save_extraction_artifacts(
     extracted: ExtractedDocument,
     output_dir: Path,
     source: str,
-    relative_path: Path | None = None,
+    relative_path: PurePath | None = None,
 ) -> tuple[Path, Path]:
     """Save extraction artifacts (.txt and .meta.json) as per spec.
 
@@ -343,7 +357,7 @@ def save_extraction_artifacts(
     # e.g., "Fees/document.pdf" -> "Fees__document.pdf.txt"
     # This prevents collisions when same filename exists in different subdirectories
     if relative_path:
-        source_name = str(relative_path).replace("/", "__")
+        source_name = encode_relative_path(relative_path)
     else:
         source_name = Path(extracted.source_file).name
 
@@ -21,6 +21,7 @@ from app.config import SOURCES
 from app.config import TEXT_DATA_DIR
 from app.definitions import build_definitions_index
 from app.definitions import save_definitions_index
+from app.discovery import find_document_files
 from app.embed import OpenAIEmbeddingFunction
 from app.extract import ExtractionError
 from app.extract import detect_document_version
@@ -266,15 +267,7 @@ def ingest_provider(source: str, force: bool = False) -> dict[str, int | list[st
         bm25_index.clear()
 
     # Find all supported documents recursively (sorted by relative path for deterministic ordering)
-    supported_extensions = {".pdf", ".docx", ".txt"}
-    doc_files = sorted(
-        [
-            f
-            for f in raw_dir.rglob("*")
-            if f.is_file() and f.suffix.lower() in supported_extensions
-        ],
-        key=lambda p: p.relative_to(raw_dir).as_posix().lower(),
-    )
+    doc_files = find_document_files(raw_dir)
 
     if not doc_files:
         log.warning("no_documents_found", source=source, path=str(raw_dir))
@@ -283,7 +276,7 @@ def ingest_provider(source: str, force: bool = False) -> dict[str, int | list[st
     # Prune deleted documents if not using --force (which rebuilds from scratch)
     if not force:
         # Build set of current document paths for pruning comparison
-        current_doc_paths = {str(doc.relative_to(raw_dir)) for doc in doc_files}
+        current_doc_paths = {doc.document_path for doc in doc_files}
         prune_deleted_documents(source, collection, current_doc_paths)
 
     doc_count = 0
@@ -302,31 +295,31 @@ def ingest_provider(source: str, force: bool = False) -> dict[str, int | list[st
     # Get text output directory for extraction artifacts
     text_dir = get_provider_text_dir(source)
 
-    for doc_path in tqdm(doc_files, desc=f"Processing {source}"):
+    for doc_file in tqdm(doc_files, desc=f"Processing {source}"):
+        # Relative path for subdirectory support, computed once by discovery
+        doc_path = doc_file.path
+        relative_path = doc_file.relative_path
         try:
-            # Calculate relative path for subdirectory support
-            relative_path = doc_path.relative_to(raw_dir)
-
             # Delete existing chunks for this document BEFORE extraction
             # This ensures consistency: if extraction/chunking fails, we don't
             # have stale chunks from a previous version of the document
             if not force:
                 try:
                     existing = collection.get(
-                        where={"document_path": str(relative_path)},
+                        where={"document_path": doc_file.document_path},
                         include=[],
                     )
                     if existing and existing.get("ids"):
                         collection.delete(ids=existing["ids"])
                         log.debug(
                             "deleted_existing_chunks",
-                            document_path=str(relative_path),
+                            document_path=doc_file.document_path,
                             count=len(existing["ids"]),
                         )
                 except Exception as e:
                     log.warning(
                         "failed_to_delete_existing_chunks",
-                        document_path=str(relative_path),
+                        document_path=doc_file.document_path,
                         error=str(e),
                     )
 
@@ -334,7 +327,7 @@ def ingest_provider(source: str, force: bool = False) -> dict[str, int | list[st
             log.debug(
                 "extracting_document",
                 filename=doc_path.name,
-                relative_path=str(relative_path),
+                relative_path=doc_file.document_path,
             )
             extracted = extract_document(doc_path)
 
@@ -14,6 +14,9 @@ Usage:
 """
 
 import json
+import re
+import sys
+from collections.abc import Iterator
 from dataclasses import dataclass
 from datetime import datetime
 from datetime import timezone
@@ -52,6 +55,16 @@ CONSOLE_THEME = Theme(
     }
 )
 
+# Context header emitted by query() for each retrieved chunk
+# Format: --- [PROVIDER] Document | Section | Pages X-Y ---
+_CLAUSE_HEADER_PATTERN = re.compile(
+    r"---\s*\[(?P<source>[^\]]+)\]\s*(?P<document>[^|]+)\s*\|\s*(?P<section>[^|]+)"
+    r"\s*\|\s*(?P<pages>[^-]+(?:-[^-]+)?)\s*---"
+)
+
+# Page range within a header (matches "Page 5" or "Pages 10-12")
+_PAGES_PATTERN = re.compile(r"Pages?\s*(?P<start>\d+)(?:-(?P<end>\d+))?")
+
 
 @dataclass
 class QueryResult:
@@ -66,7 +79,7 @@ class QueryResult:
     citations: list[dict[str, Any]]
     definitions: list[dict[str, Any]]
     chunks_retrieved: int
-    sources: list[str]
+    sources: tuple[str, ...]
     search_mode: str
     effective_search_mode: str
     debug_info: dict[str, Any] | None = None
@@ -87,7 +100,7 @@ class QueryResult:
             citations=data.get("citations", []),
             definitions=data.get("definitions", []),
             chunks_retrieved=data.get("chunks_retrieved", 0),
-            sources=data.get("sources", []),
+            sources=tuple(sys.intern(s) for s in data.get("sources", ())),
             search_mode=data.get("search_mode", ""),
             effective_search_mode=data.get("effective_search_mode", ""),
             debug_info=data.get("debug_info"),
@@ -289,12 +302,28 @@ def format_json(result: dict[str, Any], pretty: bool = True) -> str:
     Returns:
         JSON string.
     """
+    output = _build_payload(result)
+
+    if pretty:
+        return json.dumps(output, indent=2, ensure_ascii=False)
+    return json.dumps(output, ensure_ascii=False)
+
+
+def _build_payload(result: dict[str, Any]) -> dict[str, Any]:
+    """Build the structured JSON payload for a query result.
+
+    Args:
+        result: Query result dictionary from query().
+
+    Returns:
+        Dictionary matching the schema documented in format_json().
+    """
     qr = QueryResult.from_dict(result)
 
     # Build structured output
-    output = {
+    output: dict[str, Any] = {
         "answer": qr.answer,
-        "supporting_clauses": _extract_clauses(qr.context),
+        "supporting_clauses": list(_extract_clauses(qr.context)),
         "definitions": [
             {
                 "term": d.get("term", ""),
@@ -320,7 +349,7 @@ def format_json(result: dict[str, Any], pretty: bool = True) -> str:
             for c in qr.citations
         ],
         "metadata": {
-            "sources": qr.sources,
+            "sources": list(qr.sources),
             "chunks_retrieved": qr.chunks_retrieved,
             "search_mode": qr.search_mode,
             "effective_search_mode": qr.effective_search_mode,
@@ -338,74 +367,55 @@ def format_json(result: dict[str, Any], pretty: bool = True) -> str:
             "normalization_failed": debug_info.get("normalization_failed", False),
         }
 
-    if pretty:
-        return json.dumps(output, indent=2, ensure_ascii=False)
-    return json.dumps(output, ensure_ascii=False)
+    return output
 
 
-def _extract_clauses(context: str) -> list[dict[str, Any]]:
+def _extract_clauses(context: str) -> Iterator[dict[str, Any]]:
     """Extract supporting clauses from context string.
 
     Parses the formatted context string to extract individual clauses
-    with their source information.
+    with their source information. Clauses are yielded lazily; wrap the
+    call in ``list()`` when the full collection is needed.
 
     Args:
         context: Formatted context string from query().
 
-    Returns:
-        List of clause dictionaries with text and source info.
+    Yields:
+        Clause dictionaries with text and source info.
     """
     if not context:
-        return []
-
-    clauses = []
-    # Split on the context header pattern
-    # Format: --- [PROVIDER] Document | Section | Pages X-Y ---
-    import re
-
-    pattern = (
-        r"---\s*\[([^\]]+)\]\s*([^|]+)\s*\|\s*([^|]+)\s*\|\s*([^-]+(?:-[^-]+)?)\s*---"
-    )
-    parts = re.split(pattern, context)
-
-    # parts will be: [empty, source, doc, section, pages, text, source, doc, ...]
-    i = 1
-    while i < len(parts):
-        if i + 4 < len(parts):
-            source = parts[i].strip()
-            document = parts[i + 1].strip()
-            section = parts[i + 2].strip()
-            pages_str = parts[i + 3].strip()
-            text = parts[i + 4].strip() if i + 4 < len(parts) else ""
-
-            # Parse page range (matches "Page 5" or "Pages 10-12")
+        return
+
+    # The text of each clause runs until the next header (or end of context)
+    matches = _CLAUSE_HEADER_PATTERN.finditer(context)
+    current = next(matches, None)
+    while current is not None:
+        following = next(matches, None)
+        end = following.start() if following is not None else len(context)
+        text = context[current.end() : end].strip()
+
+        if text:
+            # A single page ("Page 5") ends where it starts
             page_start = None
             page_end = None
-            pages_match = re.search(r"Pages?\s*(\d+)(?:-(\d+))?", pages_str)
+            pages_match = _PAGES_PATTERN.search(current["pages"])
             if pages_match:
-                page_start = int(pages_match.group(1))
-                page_end = (
-                    int(pages_match.group(2)) if pages_match.group(2) else page_start
-                )
+                page_start = int(pages_match["start"])
+                page_end = int(pages_match["end"] or pages_match["start"])
 
-            if text:
-                clauses.append(
-                    {
-                        "text": text,
-                        "source": {
-                            "source": source,
-                            "document": document,
-                            "section": section,
-                            "page_start": page_start,
-                            "page_end": page_end,
-                        },
-                    }
-                )
-            i += 5
-        else:
-            break
+            yield {
+                "text": text,
+                "source": {
+                    # Interned: the same few names repeat across every clause
+                    "source": sys.intern(current["source"].strip()),
+                    "document": sys.intern(current["document"].strip()),
+                    "section": sys.intern(current["section"].strip()),
+                    "page_start": page_start,
+                    "page_end": page_end,
+                },
+            }
 
-    return clauses
+        current = following
 
 
 def print_result(
@@ -6,6 +6,8 @@ relevance to the user's question. Uses GPT-4.1 to assign 0-3 relevance scores,
 then selects the top-scoring chunks for context.
 """
 
+import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
@@ -14,13 +16,27 @@ from app.config import LLM_MODEL
 from app.config import MAX_CHUNK_LENGTH_FOR_RERANKING
 from app.config import MAX_CHUNKS_AFTER_RERANKING
 from app.config import MIN_RERANKING_SCORE
+from app.config import RERANKING_CACHE_SIZE
 from app.config import RERANKING_INCLUDE_EXPLANATIONS
 from app.config import RERANKING_TIMEOUT
+from app.llm import LLMConnectionError
 from app.llm import generate
 from app.logging import get_logger
 
 log = get_logger(__name__)
 
+# Explanation prefix for scores that fell back to the default after an error
+_SCORING_FAILED_PREFIX = "Scoring failed"
+
+# What generate() raises for a failed call: LLMConnectionError for API errors
+# and timeouts, ValueError when no API key is configured
+_SCORING_ERRORS = (LLMConnectionError, ValueError)
+
+# LRU of scores keyed by (question, model, chunk_id, chunk_text), so reranking
+# the same chunk for the same question again does not repeat the LLM call
+_score_cache: OrderedDict[tuple[str, str, str, str], tuple[int, str]] = OrderedDict()
+_score_cache_lock = threading.Lock()
+
 
 @dataclass
 class ScoredChunk:
@@ -140,24 +156,20 @@ def parse_score_response(
     return score, explanation
 
 
-def score_chunk(
-    chunk_id: str,
+def build_scoring_prompt(
     chunk_text: str,
     question: str,
-    model: str = LLM_MODEL,
     include_explanations: bool = RERANKING_INCLUDE_EXPLANATIONS,
-) -> tuple[int, str]:
-    """Score a single chunk for relevance using LLM.
+) -> tuple[str, int]:
+    """Build the user prompt and token limit for scoring one chunk.
 
     Args:
-        chunk_id: Chunk identifier for logging.
         chunk_text: The chunk text to score.
         question: User's question.
-        model: LLM model to use for scoring.
-        include_explanations: If True, request detailed explanations (costs ~50% more).
+        include_explanations: If True, ask for a score and an explanation.
 
     Returns:
-        Tuple of (relevance_score, explanation).
+        Tuple of (prompt, max_tokens).
     """
     # Truncate chunk for efficiency
     truncated_text = truncate_chunk(chunk_text)
@@ -174,32 +186,150 @@ def score_chunk(
     # Adjust max_tokens based on mode
     max_tokens = 150 if include_explanations else 10
 
+    return prompt, max_tokens
+
+
+def failed_score(reason: str) -> tuple[int, str]:
+    """Return the fallback score for a chunk that could not be scored.
+
+    Failed chunks count as somewhat relevant rather than irrelevant, so an
+    API outage degrades reranking instead of dropping every chunk.
+
+    Args:
+        reason: Why scoring failed, recorded in the explanation.
+
+    Returns:
+        Tuple of (relevance_score, explanation).
+    """
+    return 1, f"{_SCORING_FAILED_PREFIX}: {reason}"
+
+
+def _score_chunk_uncached(
+    chunk_id: str,
+    chunk_text: str,
+    question: str,
+    model: str = LLM_MODEL,
+    include_explanations: bool = RERANKING_INCLUDE_EXPLANATIONS,
+) -> tuple[int, str]:
+    """Score a single chunk with the LLM, raising if the call fails.
+
+    Args:
+        chunk_id: Chunk identifier for logging.
+        chunk_text: The chunk text to score.
+        question: User's question.
+        model: LLM model to use for scoring.
+        include_explanations: If True, request detailed explanations.
+
+    Returns:
+        Tuple of (relevance_score, explanation).
+
+    Raises:
+        LLMConnectionError: If the API call fails or times out.
+        ValueError: If OPENAI_API_KEY is not set.
+    """
+    prompt, max_tokens = build_scoring_prompt(
+        chunk_text, question, include_explanations
+    )
+
+    # Call LLM with low temperature for consistent scoring
+    response = generate(
+        system=RERANKING_SYSTEM_PROMPT,
+        prompt=prompt,
+        model=model,
+        max_tokens=max_tokens,
+        temperature=0.0,
+        timeout=RERANKING_TIMEOUT,  # Prevent hanging on slow API calls
+    )
+
+    score, explanation = parse_score_response(response, include_explanations)
+
+    log.debug(
+        "chunk_scored",
+        chunk_id=chunk_id,
+        score=score,
+        explanation=explanation[:100] if include_explanations else "(minimal mode)",
+    )
+
+    return score, explanation
+
+
+def _scoring_failed(chunk_id: str, error: Exception) -> tuple[int, str]:
+    """Log a failed scoring call and return the fallback score for it."""
+    log.warning("chunk_scoring_failed", chunk_id=chunk_id, error=str(error))
+    return failed_score(str(error))
+
+
+def score_chunk(
+    chunk_id: str,
+    chunk_text: str,
+    question: str,
+    model: str = LLM_MODEL,
+    include_explanations: bool = RERANKING_INCLUDE_EXPLANATIONS,
+) -> tuple[int, str]:
+    """Score a single chunk for relevance using LLM.
+
+    Args:
+        chunk_id: Chunk identifier for logging.
+        chunk_text: The chunk text to score.
+        question: User's question.
+        model: LLM model to use for scoring.
+        include_explanations: If True, request detailed explanations (costs ~50% more).
+
+    Returns:
+        Tuple of (relevance_score, explanation). On error (timeout or API
+        failure) the fallback from failed_score().
+    """
     try:
-        # Call LLM with low temperature for consistent scoring
-        response = generate(
-            system=RERANKING_SYSTEM_PROMPT,
-            prompt=prompt,
-            model=model,
-            max_tokens=max_tokens,
-            temperature=0.0,
-            timeout=RERANKING_TIMEOUT,  # Prevent hanging on slow API calls
+        return _score_chunk_uncached(
+            chunk_id, chunk_text, question, model, include_explanations
         )
+    except _SCORING_ERRORS as e:
+        return _scoring_failed(chunk_id, e)
 
-        score, explanation = parse_score_response(response, include_explanations)
 
-        log.debug(
-            "chunk_scored",
-            chunk_id=chunk_id,
-            score=score,
-            explanation=explanation[:100] if include_explanations else "(minimal mode)",
-        )
+def cached_score_chunk(
+    chunk_id: str,
+    chunk_text: str,
+    question: str,
+    model: str = LLM_MODEL,
+) -> tuple[int, str]:
+    """Score a chunk, reusing the result of an earlier identical request.
+
+    Only scores from successful LLM calls are cached; a failed call returns
+    the failed_score() fallback uncached, so a later rerank retries it.
+
+    Args:
+        chunk_id: Chunk identifier for logging.
+        chunk_text: The chunk text to score.
+        question: User's question.
+        model: LLM model to use for scoring.
+
+    Returns:
+        Tuple of (relevance_score, explanation).
+    """
+    key = (question, model, chunk_id, chunk_text)
+    with _score_cache_lock:
+        cached = _score_cache.get(key)
+        if cached is not None:
+            _score_cache.move_to_end(key)
+            return cached
+
+    try:
+        result = _score_chunk_uncached(chunk_id, chunk_text, question, model)
+    except _SCORING_ERRORS as e:
+        return _scoring_failed(chunk_id, e)
 
-        return score, explanation
+    with _score_cache_lock:
+        _score_cache[key] = result
+        if len(_score_cache) > RERANKING_CACHE_SIZE:
+            _score_cache.popitem(last=False)
+    return result
 
-    except Exception as e:
-        log.warning("chunk_scoring_failed", chunk_id=chunk_id, error=str(e))
-        # Default to somewhat relevant on error (timeout or API failure)
-        return 1, f"Scoring failed: {str(e)}"
+
+def clear_score_cache() -> None:
+    """Clear the cache of chunk relevance scores."""
+    with _score_cache_lock:
+        _score_cache.clear()
 
 
 def score_chunk_wrapper(args: tuple) -> tuple[int, int, str]:
@@ -212,7 +342,7 @@ def score_chunk_wrapper(args: tuple) -> tuple[int, int, str]:
         Tuple of (index, relevance_score, explanation).
     """
     index, chunk_id, chunk_text, question, model = args
-    score, explanation = score_chunk(chunk_id, chunk_text, question, model)
+    score, explanation = cached_score_chunk(chunk_id, chunk_text, question, model)
     return index, score, explanation
 
 
@@ -287,7 +417,7 @@ def rerank_chunks(
     else:
         # Sequential execution
         for chunk in chunks:
-            relevance_score, explanation = score_chunk(
+            relevance_score, explanation = cached_score_chunk(
                 chunk_id=chunk["chunk_id"],
                 chunk_text=chunk["text"],
                 question=question,
@@ -305,6 +435,37 @@ def rerank_chunks(
                 )
             )
 
+    kept_chunks, dropped_chunks = select_scored_chunks(
+        scored_chunks, min_score, max_chunks
+    )
+
+    log.info(
+        "rerank_complete",
+        total_chunks=len(chunks),
+        kept=len(kept_chunks),
+        dropped=len(dropped_chunks),
+        top_scores=[c.relevance_score for c in kept_chunks],
+    )
+
+    return kept_chunks, dropped_chunks
+
+
+def select_scored_chunks(
+    scored_chunks: list[ScoredChunk],
+    min_score: int = MIN_RERANKING_SCORE,
+    max_chunks: int = MAX_CHUNKS_AFTER_RERANKING,
+) -> tuple[list[ScoredChunk], list[ScoredChunk]]:
+    """Split scored chunks into those kept for context and those dropped.
+
+    Args:
+        scored_chunks: Chunks with LLM relevance scores; sorted in place.
+        min_score: Minimum relevance score to keep a chunk.
+        max_chunks: Maximum number of chunks to keep.
+
+    Returns:
+        Tuple of (kept_chunks, dropped_chunks), both sorted by relevance_score
+        descending, then by original retrieval score.
+    """
     # Sort by relevance score (descending), then by original score
     scored_chunks.sort(
         key=lambda x: (x.relevance_score, x.original_score), reverse=True
@@ -317,14 +478,6 @@ def rerank_chunks(
 
     dropped_chunks = [chunk for chunk in scored_chunks if chunk not in kept_chunks]
 
-    log.info(
-        "rerank_complete",
-        total_chunks=len(chunks),
-        kept=len(kept_chunks),
-        dropped=len(dropped_chunks),
-        top_scores=[c.relevance_score for c in kept_chunks],
-    )
-
     return kept_chunks, dropped_chunks
 
 
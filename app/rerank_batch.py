@@ -0,0 +1,307 @@
+# app/rerank_batch.py
+"""Offline LLM reranking through the OpenAI Batch API.
+
+Scores every chunk with one uploaded JSONL batch instead of one chat
+completion per chunk. Batches cost half as much but finish asynchronously
+(within 24 hours), so this suits offline evaluation runs rather than
+interactive queries, which use rerank_chunks().
+"""
+
+import json
+import time
+from typing import Any
+
+from openai import OpenAIError
+
+from app.config import LLM_MODEL
+from app.config import MAX_CHUNKS_AFTER_RERANKING
+from app.config import MIN_RERANKING_SCORE
+from app.config import RERANKING_BATCH_MAX_WAIT
+from app.config import RERANKING_BATCH_POLL_INTERVAL
+from app.config import RERANKING_INCLUDE_EXPLANATIONS
+from app.llm import LLMConnectionError
+from app.llm import get_openai_client
+from app.logging import get_logger
+from app.rerank import RERANKING_SYSTEM_PROMPT
+from app.rerank import ScoredChunk
+from app.rerank import build_scoring_prompt
+from app.rerank import failed_score
+from app.rerank import parse_score_response
+from app.rerank import select_scored_chunks
+
+log = get_logger(__name__)
+
+# Batch statuses after which the batch will not change again
+_TERMINAL_BATCH_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+def build_batch_requests(
+    chunks: list[dict[str, Any]],
+    question: str,
+    model: str = LLM_MODEL,
+    include_explanations: bool = RERANKING_INCLUDE_EXPLANATIONS,
+) -> str:
+    """Build the Batch API input file for scoring chunks.
+
+    Each line is one chat completion request whose custom_id is the chunk_id,
+    using the same prompts and limits as score_chunk().
+
+    Args:
+        chunks: Chunk dictionaries with chunk_id and text keys.
+        question: User's question for relevance scoring.
+        model: LLM model to use for scoring.
+        include_explanations: If True, request detailed explanations.
+
+    Returns:
+        JSONL text with one request per chunk.
+
+    Raises:
+        ValueError: If two chunks share a chunk_id, since their results could
+            not be told apart in the output file.
+    """
+    seen: set[str] = set()
+    duplicates: set[str] = set()
+    for chunk in chunks:
+        if chunk["chunk_id"] in seen:
+            duplicates.add(chunk["chunk_id"])
+        seen.add(chunk["chunk_id"])
+    if duplicates:
+        raise ValueError(
+            f"Duplicate chunk_ids in batch: {', '.join(sorted(duplicates))}"
+        )
+
+    lines = []
+    for chunk in chunks:
+        prompt, max_tokens = build_scoring_prompt(
+            chunk["text"], question, include_explanations
+        )
+        request = {
+            "custom_id": chunk["chunk_id"],
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": RERANKING_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                "max_tokens": max_tokens,
+                "temperature": 0.0,
+            },
+        }
+        lines.append(json.dumps(request))
+    return "\n".join(lines) + "\n"
+
+
+def parse_batch_output(
+    output: str,
+    include_explanations: bool = RERANKING_INCLUDE_EXPLANATIONS,
+) -> dict[str, tuple[int, str]]:
+    """Parse a Batch API output file into scores by chunk_id.
+
+    Requests that failed inside the batch get the failed_score() fallback,
+    as failed score_chunk() calls do.
+
+    Args:
+        output: JSONL text of the batch output file.
+        include_explanations: Whether explanations were requested.
+
+    Returns:
+        Mapping of chunk_id to (relevance_score, explanation).
+    """
+    scores: dict[str, tuple[int, str]] = {}
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        chunk_id = record["custom_id"]
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            error = record.get("error") or response.get("body")
+            log.warning("batch_chunk_scoring_failed", chunk_id=chunk_id, error=error)
+            scores[chunk_id] = failed_score(str(error))
+            continue
+        content = response["body"]["choices"][0]["message"]["content"] or ""
+        scores[chunk_id] = parse_score_response(content, include_explanations)
+    return scores
+
+
+def _cancel_batch(client: Any, batch_id: str) -> None:
+    """Cancel a batch we stopped waiting for, so it does not keep running.
+
+    Best effort: an API or connection error from the cancel is logged and
+    otherwise ignored, leaving the timeout as the error the caller sees.
+    """
+    try:
+        client.batches.cancel(batch_id)
+    except OpenAIError as e:
+        log.warning("rerank_batch_cancel_failed", batch_id=batch_id, error=str(e))
+
+
+def _read_error_file(client: Any, batch: Any) -> dict[str, tuple[int, str]]:
+    """Parse the batch's error file, which holds the requests that failed.
+
+    parse_batch_output() logs each failed request. Best effort: an error
+    fetching the file is logged and treated as an empty file.
+
+    Returns:
+        Fallback scores by chunk_id for the failed requests.
+    """
+    if not batch.error_file_id:
+        return {}
+    try:
+        errors = client.files.content(batch.error_file_id).text
+    except OpenAIError as e:
+        log.warning(
+            "rerank_batch_error_file_unreadable",
+            batch_id=batch.id,
+            file_id=batch.error_file_id,
+            error=str(e),
+        )
+        return {}
+    return parse_batch_output(errors)
+
+
+def _delete_batch_files(client: Any, input_file_id: str, batch: Any) -> None:
+    """Delete the input file and any output or error file of a batch run.
+
+    Best effort: an API or connection error from a delete is logged and
+    otherwise ignored, so it never hides the rerank result or error.
+    """
+    file_ids = [input_file_id]
+    if batch is not None:
+        file_ids += [f for f in (batch.output_file_id, batch.error_file_id) if f]
+    for file_id in file_ids:
+        try:
+            client.files.delete(file_id)
+        except OpenAIError as e:
+            log.warning(
+                "rerank_batch_file_delete_failed", file_id=file_id, error=str(e)
+            )
+
+
+def rerank_chunks_batch(
+    chunks: list[dict[str, Any]],
+    question: str,
+    min_score: int = MIN_RERANKING_SCORE,
+    max_chunks: int = MAX_CHUNKS_AFTER_RERANKING,
+    model: str = LLM_MODEL,
+    poll_interval: float = RERANKING_BATCH_POLL_INTERVAL,
+    max_wait: float = RERANKING_BATCH_MAX_WAIT,
+) -> tuple[list[ScoredChunk], list[ScoredChunk]]:
+    """Rerank chunks with a single OpenAI Batch API job.
+
+    Uploads one request per chunk, waits for the batch to finish and keeps
+    chunks exactly as rerank_chunks() does.
+
+    Args:
+        chunks: List of chunk dictionaries with keys: chunk_id, text, metadata,
+                score (original retrieval score), source (retrieval method).
+        question: User's question for relevance scoring.
+        min_score: Minimum relevance score to keep a chunk.
+        max_chunks: Maximum number of chunks to keep.
+        model: LLM model to use for scoring.
+        poll_interval: Seconds to wait between batch status checks.
+        max_wait: Seconds to wait for the batch before giving up.
+
+    Returns:
+        Tuple of (kept_chunks, dropped_chunks) where each is a list of ScoredChunk.
+        kept_chunks are sorted by relevance_score descending.
+
+    Raises:
+        ValueError: If two chunks share a chunk_id, or if OPENAI_API_KEY is
+            not set.
+        LLMConnectionError: If the batch fails, expires, is cancelled or does
+            not finish within max_wait (in which case it is cancelled).
+    """
+    if not chunks:
+        log.debug("rerank_batch_no_chunks")
+        return [], []
+
+    client = get_openai_client()
+    requests_jsonl = build_batch_requests(chunks, question, model)
+    input_file = client.files.create(
+        file=("rerank_batch.jsonl", requests_jsonl.encode("utf-8")),
+        purpose="batch",
+    )
+    # Every file the run creates is deleted however it ends, so reranking
+    # leaves nothing behind in the OpenAI account
+    batch = None
+    try:
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        log.info("rerank_batch_submitted", batch_id=batch.id, chunk_count=len(chunks))
+
+        deadline = time.monotonic() + max_wait
+        while batch.status not in _TERMINAL_BATCH_STATUSES:
+            if time.monotonic() >= deadline:
+                _cancel_batch(client, batch.id)
+                raise LLMConnectionError(
+                    f"Batch {batch.id} did not finish within {max_wait}s"
+                )
+            time.sleep(poll_interval)
+            batch = client.batches.retrieve(batch.id)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            batch_errors = (batch.errors.data if batch.errors else None) or []
+            errors = [f"{error.code}: {error.message}" for error in batch_errors]
+            log.error(
+                "rerank_batch_failed",
+                batch_id=batch.id,
+                status=batch.status,
+                errors=errors,
+            )
+            _read_error_file(client, batch)
+            detail = f": {'; '.join(errors)}" if errors else ""
+            raise LLMConnectionError(
+                f"Batch {batch.id} ended with status {batch.status}{detail}"
+            )
+
+        if batch.request_counts and batch.request_counts.failed:
+            log.warning(
+                "rerank_batch_requests_failed",
+                batch_id=batch.id,
+                failed=batch.request_counts.failed,
+                total=batch.request_counts.total,
+            )
+        # Failed requests are only in the error file, not the output file
+        scores = _read_error_file(client, batch)
+        scores.update(
+            parse_batch_output(client.files.content(batch.output_file_id).text)
+        )
+    finally:
+        _delete_batch_files(client, input_file.id, batch)
+
+    scored_chunks = []
+    for chunk in chunks:
+        relevance_score, explanation = scores.get(
+            chunk["chunk_id"], failed_score("missing from batch output")
+        )
+        scored_chunks.append(
+            ScoredChunk(
+                chunk_id=chunk["chunk_id"],
+                text=chunk["text"],
+                metadata=chunk["metadata"],
+                original_score=chunk.get("score", 0.0),
+                relevance_score=relevance_score,
+                explanation=explanation,
+                source=chunk.get("source", "unknown"),
+            )
+        )
+
+    kept_chunks, dropped_chunks = select_scored_chunks(
+        scored_chunks, min_score, max_chunks
+    )
+
+    log.info(
+        "rerank_batch_complete",
+        batch_id=batch.id,
+        total_chunks=len(chunks),
+        kept=len(kept_chunks),
+        dropped=len(dropped_chunks),
+    )
+
+    return kept_chunks, dropped_chunks
@@ -24,9 +24,11 @@ import pickle
 import re
 from dataclasses import dataclass
 from enum import Enum
+from operator import itemgetter
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 from rank_bm25 import BM25Okapi
 
 from app.logging import get_logger
@@ -42,6 +44,9 @@ BM25_INDEX_VERSION = "1.0"
 # Magic bytes to identify valid index files (helps detect corruption)
 BM25_INDEX_MAGIC = b"BM25IDX1"
 
+# Runs of alphanumerics in lowercased text; everything else separates tokens
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
 
 class SearchMode(Enum):
     """Search mode options."""
@@ -74,10 +79,8 @@ def tokenize(text: str) -> list[str]:
     Returns:
         List of tokens.
     """
-    # Lowercase and split on non-alphanumeric
-    tokens = re.split(r"[^a-zA-Z0-9]+", text.lower())
-    # Filter short tokens
-    return [t for t in tokens if len(t) >= 2]
+    # Lowercase, take alphanumeric runs and drop short tokens
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if len(t) >= 2]
 
 
 class BM25Index:
@@ -98,6 +101,12 @@ class BM25Index:
         self.documents: list[str] = []
         self.tokenized_corpus: list[list[str]] = []
         self.bm25: BM25Okapi | None = None
+        # Per-term (document indices, BM25 score contributions), see build()
+        self._term_weights: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of documents in the index."""
+        return len(self.chunk_ids)
 
     def add_documents(
         self,
@@ -137,6 +146,7 @@ class BM25Index:
             return
 
         self.bm25 = BM25Okapi(self.tokenized_corpus)
+        self._term_weights = _precompute_term_weights(self.bm25)
         log.info(
             "bm25_index_built",
             source=self.source,
@@ -161,14 +171,20 @@ class BM25Index:
         if not query_tokens:
             return []
 
-        scores = self.bm25.get_scores(query_tokens)
+        # Same scores as BM25Okapi.get_scores, but each query token only
+        # touches the documents that contain it
+        scores = np.zeros(len(self.chunk_ids))
+        for token in query_tokens:
+            posting = self._term_weights.get(token)
+            if posting is not None:
+                doc_indices, weights = posting
+                scores[doc_indices] += weights
 
-        # Get top-k indices
-        scored_indices = [(i, scores[i]) for i in range(len(scores))]
-        scored_indices.sort(key=lambda x: x[1], reverse=True)
-        top_indices = scored_indices[:top_k]
+        # Positive scores, highest first; ties keep corpus order
+        ranked = np.flatnonzero(scores > 0)
+        ranked = ranked[np.argsort(-scores[ranked], kind="stable")][:top_k]
 
-        return [(self.chunk_ids[i], score) for i, score in top_indices if score > 0]
+        return [(self.chunk_ids[i], scores[i]) for i in ranked]
 
     def get_index_path(self) -> Path:
         """Get the file path for this source's BM25 index.
@@ -199,7 +215,7 @@ class BM25Index:
         with open(index_path, "wb") as f:
             # Write magic bytes first for format identification
             f.write(BM25_INDEX_MAGIC)
-            pickle.dump(data, f)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
 
         log.info(
             "bm25_index_saved",
@@ -289,6 +305,7 @@ class BM25Index:
         self.documents = []
         self.tokenized_corpus = []
         self.bm25 = None
+        self._term_weights = {}
 
         index_path = self.get_index_path()
         if index_path.exists():
@@ -296,6 +313,46 @@ class BM25Index:
             log.info("bm25_index_deleted", source=self.source)
 
 
+def _precompute_term_weights(
+    bm25: BM25Okapi,
+) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Precompute each term's BM25 score contribution to every document it is in.
+
+    A query's score is then the sum of its tokens' contributions, so querying
+    costs one vectorized add per token instead of a pass over every document.
+    The arithmetic mirrors BM25Okapi.get_scores, so scores are identical.
+
+    Args:
+        bm25: Built BM25Okapi model.
+
+    Returns:
+        Mapping of term to (document indices, score contributions). Terms with
+        a zero IDF contribute nothing and are omitted.
+    """
+    postings: dict[str, tuple[list[int], list[int]]] = {}
+    for doc_index, frequencies in enumerate(bm25.doc_freqs):
+        for term, freq in frequencies.items():
+            doc_indices, freqs = postings.setdefault(term, ([], []))
+            doc_indices.append(doc_index)
+            freqs.append(freq)
+
+    k1, b = bm25.k1, bm25.b
+    length_norm = k1 * (1 - b + b * np.array(bm25.doc_len) / bm25.avgdl)
+
+    weights: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    for term, (doc_indices, freqs) in postings.items():
+        idf = bm25.idf.get(term) or 0
+        if not idf:
+            continue
+        indices = np.array(doc_indices, dtype=np.intp)
+        freq = np.array(freqs)
+        weights[term] = (
+            indices,
+            idf * (freq * (k1 + 1) / (freq + length_norm[indices])),
+        )
+    return weights
+
+
 def rrf_score(rank: int, k: int = 60) -> float:
     """Calculate Reciprocal Rank Fusion (RRF) score.
 
@@ -333,22 +390,15 @@ def merge_results_rrf(
         List of (chunk_id, combined_rrf_score) sorted by score descending.
     """
     combined_scores: dict[str, float] = {}
+    get = combined_scores.get
 
-    # Add RRF scores from vector results
-    for rank, (chunk_id, _) in enumerate(vector_results, start=1):
-        combined_scores[chunk_id] = combined_scores.get(chunk_id, 0) + rrf_score(
-            rank, k
-        )
-
-    # Add RRF scores from BM25 results
-    for rank, (chunk_id, _) in enumerate(bm25_results, start=1):
-        combined_scores[chunk_id] = combined_scores.get(chunk_id, 0) + rrf_score(
-            rank, k
-        )
+    # Add RRF scores from both lists; 1 / (k + rank) is rrf_score inlined
+    for results in (vector_results, bm25_results):
+        for k_plus_rank, (chunk_id, _) in enumerate(results, start=k + 1):
+            combined_scores[chunk_id] = get(chunk_id, 0) + 1.0 / k_plus_rank
 
     # Sort by combined score
-    sorted_results = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
-    return sorted_results
+    return sorted(combined_scores.items(), key=itemgetter(1), reverse=True)
 
 
 class HybridSearcher:
@@ -527,7 +577,7 @@ class HybridSearcher:
 
         # Get BM25 results if available
         bm25_tuples: list[tuple[str, float]] = []
-        if self.bm25_index:
+        if self.bm25_index is not None:
             bm25_tuples = self.bm25_index.query(question, candidate_count)
 
         # If no BM25 index, fall back to vector-only
@@ -12,14 +12,29 @@ This moves some compliance guarantees from prompt text into code enforcement.
 
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 
 from app.logging import get_logger
+from app.prompts import OPTIONAL_SECTIONS
 from app.prompts import REFUSAL_TEMPLATE
 from app.prompts import REQUIRED_ANSWER_SECTIONS
 from app.prompts import REQUIRED_REFUSAL_SECTIONS
 
 log = get_logger(__name__)
 
+# Every known section header; one scan finds all that occur anywhere in output
+_SECTION_PATTERN = re.compile(
+    "|".join(
+        re.escape(section)
+        for section in dict.fromkeys(
+            REQUIRED_ANSWER_SECTIONS + REQUIRED_REFUSAL_SECTIONS + OPTIONAL_SECTIONS
+        )
+    )
+)
+
+# Body of the Citations section, up to the next header or end of output
+_CITATIONS_SECTION_PATTERN = re.compile(r"## Citations\s*\n(.*?)(?=\n##|\Z)", re.DOTALL)
+
 
 @dataclass
 class ValidationResult:
@@ -50,10 +65,17 @@ def validate_llm_output(output: str, sources: list[str]) -> ValidationResult:
     """
     errors = []
     warnings = []
-    is_refusal = _is_refusal_response(output, sources)
+
+    # Blank output has no sections and no refusal, so skip every scan
+    if not output or output.isspace():
+        is_refusal = False
+        found_sections: set[str] = set()
+    else:
+        is_refusal = _is_refusal_response(output, sources)
+        found_sections = set(_SECTION_PATTERN.findall(output))
 
     # Check for required sections
-    section_errors = _validate_required_sections(output, is_refusal)
+    section_errors = _validate_required_sections(found_sections, is_refusal)
     errors.extend(section_errors)
 
     # Validate refusal format if it's a refusal
@@ -62,21 +84,22 @@ def validate_llm_output(output: str, sources: list[str]) -> ValidationResult:
         errors.extend(refusal_errors)
 
         # Check that Supporting Clauses is NOT present when refusing
-        if "## Supporting Clauses" in output:
+        if "## Supporting Clauses" in found_sections:
             errors.append(
                 "Supporting Clauses section should be omitted when refusing to answer"
             )
     else:
         # For answers, require Supporting Clauses and Citations (strict grounding)
         # This enforces accuracy-first principle from Phase 7
-        if "## Supporting Clauses" not in output:
+        if "## Supporting Clauses" not in found_sections:
             errors.append("Missing required '## Supporting Clauses' section for answer")
-        if "## Citations" not in output:
+        if "## Citations" not in found_sections:
             errors.append("Missing required '## Citations' section for answer")
 
         # Validate citations format if present
-        citation_warnings = _validate_citations(output)
-        warnings.extend(citation_warnings)
+        if "## Citations" in found_sections:
+            citation_warnings = _validate_citations(output)
+            warnings.extend(citation_warnings)
 
     is_valid = len(errors) == 0
 
@@ -103,6 +126,22 @@ def validate_llm_output(output: str, sources: list[str]) -> ValidationResult:
     )
 
 
+@lru_cache(maxsize=128)
+def _canonical_refusal(sources: tuple[str, ...]) -> str:
+    """Build the canonical refusal for sources using REFUSAL_TEMPLATE.
+
+    Cached because every validation (and retry prompt) for a query formats
+    the same refusal for the same sources.
+
+    Args:
+        sources: Source names, as a tuple so they can be cached.
+
+    Returns:
+        Refusal message naming the sources in uppercase.
+    """
+    return REFUSAL_TEMPLATE.format(source=", ".join(s.upper() for s in sources))
+
+
 def _is_refusal_response(output: str, sources: list[str]) -> bool:
     """Check if the output is a refusal rather than an answer.
 
@@ -115,23 +154,18 @@ def _is_refusal_response(output: str, sources: list[str]) -> bool:
     Returns:
         True if output appears to be a refusal, False otherwise.
     """
-    # Build canonical refusal using centralized template
-    if len(sources) == 1:
-        source_label = sources[0].upper()
-    else:
-        source_label = ", ".join(s.upper() for s in sources)
-
-    canonical_refusal = REFUSAL_TEMPLATE.format(source=source_label)
-    return canonical_refusal in output
+    return _canonical_refusal(tuple(sources)) in output
 
 
-def _validate_required_sections(output: str, is_refusal: bool) -> list[str]:
+def _validate_required_sections(
+    found_sections: set[str], is_refusal: bool
+) -> list[str]:
     """Validate that required sections are present.
 
     Uses REQUIRED_ANSWER_SECTIONS and REQUIRED_REFUSAL_SECTIONS from prompts.py.
 
     Args:
-        output: The LLM response text.
+        found_sections: Section headers found in the LLM response text.
         is_refusal: Whether the output is a refusal.
 
     Returns:
@@ -141,7 +175,7 @@ def _validate_required_sections(output: str, is_refusal: bool) -> list[str]:
     required = REQUIRED_REFUSAL_SECTIONS if is_refusal else REQUIRED_ANSWER_SECTIONS
 
     for section in required:
-        if section not in output:
+        if section not in found_sections:
             section_type = "refusal" if is_refusal else "answer"
             errors.append(f"Missing required '{section}' section for {section_type}")
 
@@ -162,13 +196,7 @@ def _validate_refusal_format(output: str, sources: list[str]) -> list[str]:
     """
     errors = []
 
-    # Build expected refusal message using centralized template
-    if len(sources) == 1:
-        source_label = sources[0].upper()
-    else:
-        source_label = ", ".join(s.upper() for s in sources)
-
-    expected_refusal = REFUSAL_TEMPLATE.format(source=source_label)
+    expected_refusal = _canonical_refusal(tuple(sources))
 
     # Check if refusal message appears in Answer section
     if expected_refusal not in output:
@@ -192,7 +220,7 @@ def _validate_citations(output: str) -> list[str]:
     warnings: list[str] = []
 
     # Extract Citations section
-    citations_match = re.search(r"## Citations\s*\n(.*?)(?=\n##|\Z)", output, re.DOTALL)
+    citations_match = _CITATIONS_SECTION_PATTERN.search(output)
 
     if not citations_match:
         # Already caught by required sections check
@@ -226,13 +254,7 @@ def get_stricter_system_prompt(original_prompt: str, sources: list[str]) -> str:
     Returns:
         Enhanced system prompt with stronger validation warnings.
     """
-    # Build source label for refusal example
-    if len(sources) == 1:
-        source_label = sources[0].upper()
-    else:
-        source_label = ", ".join(s.upper() for s in sources)
-
-    refusal_example = REFUSAL_TEMPLATE.format(source=source_label)
+    refusal_example = _canonical_refusal(tuple(sources))
 
     # Add a warning banner at the start
     warning = f"""
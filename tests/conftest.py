@@ -45,6 +45,21 @@ def reset_rate_limiter():
     api.middleware.rate_limit._rate_limiter = api.middleware.rate_limit.RateLimiter()
 
 
+@pytest.fixture(autouse=True, scope="function")
+def clear_rerank_score_cache():
+    """Start and end every test with an empty rerank score cache.
+
+    Any module can reach rerank_chunks() (directly or through query), so
+    scores cached by one test must not be visible to the next.
+    """
+    # Import here, like the rate limiter, so conftest imports no app modules
+    from app.rerank import clear_score_cache
+
+    clear_score_cache()
+    yield
+    clear_score_cache()
+
+
 @pytest.fixture
 def auth_headers() -> dict[str, str]:
     """Return authentication headers for API requests.
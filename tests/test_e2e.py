@@ -284,7 +284,7 @@ class TestHybridSearchE2E:
             # Load and verify
             loaded = BM25Index.load("test_provider")
             assert loaded is not None
-            assert len(loaded.chunk_ids) == len(sample_documents)
+            assert len(loaded) == len(sample_documents)
 
             # Query should find fee-related documents
             results = loaded.query("fee schedule real-time data", top_k=3)
@@ -2,10 +2,12 @@
 """Tests for document ingestion."""
 
 from pathlib import Path
+from pathlib import PurePosixPath
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
 from app.chunking import Chunk
+from app.discovery import DocumentFile
 from app.ingest import chunks_to_chroma_format
 from app.ingest import get_collection_name
 from app.ingest import prune_deleted_documents
@@ -275,26 +277,17 @@ class TestStaleChunkCleanup:
                 # Mock the file existence check
                 with (
                     patch.object(Path, "exists", return_value=True),
-                    patch.object(Path, "rglob") as mock_rglob,
+                    patch("app.ingest.find_document_files") as mock_find_files,
                 ):
                     # Mock finding one PDF file
-                    test_file = temp_dir / "test.pdf"
-                    mock_rglob.return_value = [test_file]
-
-                    # Mock file check
-                    with (
-                        patch.object(Path, "is_file", return_value=True),
-                        patch.object(
-                            Path,
-                            "suffix",
-                            new_callable=lambda: property(lambda self: ".pdf"),
-                        ),
-                        patch.object(
-                            Path, "relative_to", return_value=Path("test.pdf")
-                        ),
-                    ):
-                        # Run ingestion
-                        result = ingest_provider("cme", force=False)
+                    mock_find_files.return_value = [
+                        DocumentFile(
+                            temp_dir / "test.pdf", PurePosixPath("test.pdf"), "test.pdf"
+                        )
+                    ]
+
+                    # Run ingestion
+                    result = ingest_provider("cme", force=False)
 
             # Verify old chunks were deleted BEFORE extraction failed
             mock_collection.delete.assert_called_once_with(
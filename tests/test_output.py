@@ -2,16 +2,34 @@
 """Tests for output formatters."""
 
 import json
+from datetime import datetime
+from datetime import timezone
+from unittest.mock import patch
 
 import pytest
 
 from app.output import OutputFormat
 from app.output import QueryResult
+from app.output import _build_payload
 from app.output import _extract_clauses
 from app.output import format_console
 from app.output import format_json
 from app.output import print_result
 
+FROZEN_NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def frozen_now():
+    """Freeze the timestamp written by format_json for one test.
+
+    Only tests that assert on the timestamp request it; the patch is undone
+    after each test, so other tests see the real datetime.
+    """
+    with patch("app.output.datetime") as mock_datetime:
+        mock_datetime.now.return_value = FROZEN_NOW
+        yield mock_datetime
+
 
 @pytest.fixture
 def sample_result() -> dict:
@@ -89,7 +107,7 @@ class TestQueryResult:
         assert len(qr.citations) == 2
         assert len(qr.definitions) == 1
         assert qr.chunks_retrieved == 2
-        assert qr.sources == ["cme"]
+        assert qr.sources == ("cme",)
         assert qr.search_mode == "hybrid"
         assert qr.effective_search_mode == "hybrid"
 
@@ -112,7 +130,7 @@ class TestQueryResult:
         assert qr.citations == []
         assert qr.definitions == []
         assert qr.chunks_retrieved == 0
-        assert qr.sources == []
+        assert qr.sources == ()
         assert qr.search_mode == ""
         assert qr.effective_search_mode == ""
 
@@ -205,31 +223,34 @@ class TestFormatJson:
         parsed = json.loads(output)
         assert isinstance(parsed, dict)
 
+    def test_format_json_matches_payload(self, sample_result: dict, frozen_now) -> None:
+        """Test that format_json serializes the built payload."""
+        parsed = json.loads(format_json(sample_result))
+
+        assert parsed == _build_payload(sample_result)
+
     def test_format_json_schema(self, sample_result: dict) -> None:
         """Test that JSON output has the expected schema."""
-        output = format_json(sample_result)
-        parsed = json.loads(output)
+        payload = _build_payload(sample_result)
 
         # Check top-level keys
-        assert "answer" in parsed
-        assert "supporting_clauses" in parsed
-        assert "definitions" in parsed
-        assert "citations" in parsed
-        assert "metadata" in parsed
+        assert "answer" in payload
+        assert "supporting_clauses" in payload
+        assert "definitions" in payload
+        assert "citations" in payload
+        assert "metadata" in payload
 
     def test_format_json_answer(self, sample_result: dict) -> None:
         """Test that JSON contains the answer."""
-        output = format_json(sample_result)
-        parsed = json.loads(output)
+        payload = _build_payload(sample_result)
 
-        assert parsed["answer"] == sample_result["answer"]
+        assert payload["answer"] == sample_result["answer"]
 
     def test_format_json_citations(self, sample_result: dict) -> None:
         """Test that JSON contains structured citations."""
-        output = format_json(sample_result)
-        parsed = json.loads(output)
+        payload = _build_payload(sample_result)
 
-        citations = parsed["citations"]
+        citations = payload["citations"]
         assert len(citations) == 2
 
         # Check citation structure
@@ -242,10 +263,9 @@ class TestFormatJson:
 
     def test_format_json_definitions(self, sample_result: dict) -> None:
         """Test that JSON contains structured definitions."""
-        output = format_json(sample_result)
-        parsed = json.loads(output)
+        payload = _build_payload(sample_result)
 
-        definitions = parsed["definitions"]
+        definitions = payload["definitions"]
         assert len(definitions) == 1
 
         # Check definition structure
@@ -258,25 +278,23 @@ class TestFormatJson:
 
     def test_format_json_metadata(self, sample_result: dict) -> None:
         """Test that JSON contains metadata."""
-        output = format_json(sample_result)
-        parsed = json.loads(output)
+        payload = _build_payload(sample_result)
 
-        metadata = parsed["metadata"]
+        metadata = payload["metadata"]
         assert metadata["sources"] == ["cme"]
         assert metadata["chunks_retrieved"] == 2
         assert metadata["search_mode"] == "hybrid"
         assert metadata["effective_search_mode"] == "hybrid"
         assert "timestamp" in metadata
 
-    def test_format_json_timestamp_format(self, sample_result: dict) -> None:
+    def test_format_json_timestamp_format(
+        self, sample_result: dict, frozen_now
+    ) -> None:
         """Test that timestamp is ISO-8601 format."""
-        output = format_json(sample_result)
-        parsed = json.loads(output)
+        payload = _build_payload(sample_result)
 
-        timestamp = parsed["metadata"]["timestamp"]
-        # Should contain T and timezone info
-        assert "T" in timestamp
-        assert "+" in timestamp or "Z" in timestamp
+        assert payload["metadata"]["timestamp"] == "2024-01-01T00:00:00+00:00"
+        frozen_now.now.assert_called_with(timezone.utc)
 
     def test_format_json_compact(self, sample_result: dict) -> None:
         """Test compact JSON output (pretty=False)."""
@@ -291,14 +309,13 @@ class TestFormatJson:
 
     def test_format_json_minimal_result(self, minimal_result: dict) -> None:
         """Test JSON formatting with minimal result."""
-        output = format_json(minimal_result)
-        parsed = json.loads(output)
+        payload = _build_payload(minimal_result)
 
-        assert parsed["answer"] == minimal_result["answer"]
-        assert parsed["supporting_clauses"] == []
-        assert parsed["definitions"] == []
-        assert parsed["citations"] == []
-        assert parsed["metadata"]["chunks_retrieved"] == 0
+        assert payload["answer"] == minimal_result["answer"]
+        assert payload["supporting_clauses"] == []
+        assert payload["definitions"] == []
+        assert payload["citations"] == []
+        assert payload["metadata"]["chunks_retrieved"] == 0
 
 
 class TestExtractClauses:
@@ -313,7 +330,7 @@ class TestExtractClauses:
             "Second clause text here."
         )
 
-        clauses = _extract_clauses(context)
+        clauses = list(_extract_clauses(context))
 
         assert len(clauses) == 2
         assert clauses[0]["text"] == "First clause text here."
@@ -325,15 +342,39 @@ class TestExtractClauses:
         """Test extracting clauses with page ranges."""
         context = "--- [CME] Document.pdf | Section 1 | Pages 10-12 ---\nClause text."
 
-        clauses = _extract_clauses(context)
+        clauses = list(_extract_clauses(context))
 
         assert len(clauses) == 1
         assert clauses[0]["source"]["page_start"] == 10
         assert clauses[0]["source"]["page_end"] == 12
 
+    def test_extract_clauses_single_page(self) -> None:
+        """Test that a single page sets both ends of the range."""
+        context = "--- [CME] Document.pdf | Section 1 | Page 7 ---\nClause text."
+
+        clauses = list(_extract_clauses(context))
+
+        assert clauses[0]["source"]["page_start"] == 7
+        assert clauses[0]["source"]["page_end"] == 7
+
+    def test_extract_clauses_interns_source_fields(self) -> None:
+        """Test that repeated source fields share one string object."""
+        context = (
+            "--- [CME] Document.pdf | Section 1 | Page 5 ---\n"
+            "First clause text here.\n\n"
+            "--- [CME] Document.pdf | Section 1 | Page 6 ---\n"
+            "Second clause text here."
+        )
+
+        first, second = _extract_clauses(context)
+
+        assert first["source"]["source"] is second["source"]["source"]
+        assert first["source"]["document"] is second["source"]["document"]
+        assert first["source"]["section"] is second["source"]["section"]
+
     def test_extract_clauses_empty_context(self) -> None:
         """Test extracting clauses from empty context."""
-        clauses = _extract_clauses("")
+        clauses = list(_extract_clauses(""))
 
         assert clauses == []
 
@@ -341,10 +382,25 @@ class TestExtractClauses:
         """Test extracting clauses from context without headers."""
         context = "Just some text without any headers."
 
-        clauses = _extract_clauses(context)
+        clauses = list(_extract_clauses(context))
 
         assert clauses == []
 
+    def test_extract_clauses_is_lazy(self) -> None:
+        """Test that clauses are yielded one at a time."""
+        context = (
+            "--- [CME] Document.pdf | Section 1 | Page 5 ---\n"
+            "First clause text here.\n\n"
+            "--- [CME] Another.pdf | Section 2 | Pages 10-12 ---\n"
+            "Second clause text here."
+        )
+
+        clauses = _extract_clauses(context)
+
+        assert next(clauses)["text"] == "First clause text here."
+        assert next(clauses)["text"] == "Second clause text here."
+        assert next(clauses, None) is None
+
 
 class TestPrintResult:
     """Tests for print_result function."""
@@ -5,87 +5,151 @@ These tests verify that prompts enforce accuracy requirements and
 maintain consistent refusal behavior.
 """
 
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import pytest
+
 from app.prompts import QA_PROMPT
 from app.prompts import QA_PROMPT_NO_DEFINITIONS
 from app.prompts import SYSTEM_PROMPT
 from app.prompts import get_refusal_message
 
+# Pure string checks; keep them on one xdist worker so the module-scoped
+# token scan runs once under `pytest -n auto --dist=loadgroup`
+pytestmark = pytest.mark.xdist_group("prompts")
+
+# The prompts are static, so lowercase them once rather than in every test
+_SYS_LOWER = SYSTEM_PROMPT.lower()
+_QA_LOWER = QA_PROMPT.lower()
+_QA_ND_LOWER = QA_PROMPT_NO_DEFINITIONS.lower()
+_COMBINED_LOWER = (SYSTEM_PROMPT + QA_PROMPT).lower()
+
+# Any prohibition phrasing; stops at the first hit
+_PROHIBITION_PATTERN = re.compile(r"do not|never|must not")
+
+# Case-sensitive literals the system prompt must contain
+_SYSTEM_LITERALS = (
+    "STRICT RULES",
+    "NEVER",
+    "ONLY using the provided context",
+    "[SOURCE]",
+    "Document Name",
+    "Pages",
+    "## Answer",
+    "## Supporting Clauses",
+    "## Definitions",
+    "## Citations",
+)
+
+# Each case passes if any of its lowercase tokens occurs in the system prompt
+_SYSTEM_TOKEN_CASES = (
+    ("external knowledge",),
+    ("training data",),
+    ("assumptions",),
+    ("citation", "cite"),
+    ("refuse", "refusal"),
+    ("not addressed",),
+    ("infer", "inference"),
+    ("extrapolate",),
+    ("quote", "quoted"),
+    ("verbatim", "exact"),
+    ("accuracy", "accurate", "mandatory"),
+    ("verification", "verify"),
+    ("before",),
+)
+
+# Lowercase literals checked against the system prompt
+_SYSTEM_TOKENS = {token for case in _SYSTEM_TOKEN_CASES for token in case} | {
+    "forbidden",
+    "never",
+    "partial",
+    "typical",
+}
+
+# Each case passes if any of its lowercase tokens occurs in the QA prompt
+_QA_TOKEN_CASES = (
+    ("context",),
+    ("not addressed",),
+    ("verification", "verify"),
+    ("refuse", "refusal"),
+    ("accuracy", "accurate"),
+)
+
+# Lowercase literals checked against the system and QA prompts combined
+_COMBINED_TOKENS = (
+    "1.",
+    "complete",
+    "external knowledge",
+    "general knowledge",
+    "partial",
+    "verification",
+)
+
+
+def _scan_tokens(text: str, tokens: Iterable[str]) -> frozenset[str]:
+    """Return the tokens that occur in text, found in a single regex pass.
+
+    The lookahead reports a match at every position with the longest token
+    tried first. A shorter token starting at the same position is a prefix
+    of the reported match, so it is recovered from the matched set.
+    """
+    ordered = sorted(set(tokens), key=len, reverse=True)
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))")
+    matched = {m.group(1) for m in pattern.finditer(text)}
+    return frozenset(t for t in ordered if any(t in m for m in matched))
+
+
+@dataclass(frozen=True)
+class PromptTokens:
+    """Tokens found in the lowercased prompts."""
+
+    system: frozenset[str]
+    qa: frozenset[str]
+    combined: frozenset[str]
+
+
+@pytest.fixture(scope="module")
+def prompt_token_presence() -> PromptTokens:
+    """Scan each prompt once for every token the tests look for."""
+    return PromptTokens(
+        system=_scan_tokens(_SYS_LOWER, _SYSTEM_TOKENS),
+        qa=_scan_tokens(
+            _QA_LOWER, [token for case in _QA_TOKEN_CASES for token in case]
+        ),
+        combined=_scan_tokens(_COMBINED_LOWER, _COMBINED_TOKENS),
+    )
+
+
+def _join_tokens(tokens: tuple[str, ...]) -> str:
+    """Build a readable test ID from a token case."""
+    return "|".join(tokens)
+
 
 class TestSystemPrompt:
     """Test SYSTEM_PROMPT structure and requirements."""
 
-    def test_system_prompt_contains_strict_rules(self):
-        """System prompt must include strict accuracy rules."""
-        assert "STRICT RULES" in SYSTEM_PROMPT
-        assert "NEVER" in SYSTEM_PROMPT
-        assert "ONLY using the provided context" in SYSTEM_PROMPT
-
-    def test_system_prompt_emphasizes_no_external_knowledge(self):
-        """System prompt must explicitly forbid external knowledge."""
-        assert "external knowledge" in SYSTEM_PROMPT.lower()
-        assert "training data" in SYSTEM_PROMPT.lower()
-        assert "assumptions" in SYSTEM_PROMPT.lower()
-
-    def test_system_prompt_requires_citations(self):
-        """System prompt must require citations."""
-        assert "citation" in SYSTEM_PROMPT.lower() or "cite" in SYSTEM_PROMPT.lower()
-        assert "[SOURCE]" in SYSTEM_PROMPT
-        assert "Document Name" in SYSTEM_PROMPT
-        assert "Page" in SYSTEM_PROMPT
+    @pytest.mark.parametrize("literal", _SYSTEM_LITERALS)
+    def test_system_prompt_contains_literal(self, literal):
+        """System prompt must include rules, citation format and output sections."""
+        assert literal in SYSTEM_PROMPT
 
-    def test_system_prompt_includes_refusal_instruction(self):
-        """System prompt must include explicit refusal instructions."""
-        assert "refuse" in SYSTEM_PROMPT.lower() or "refusal" in SYSTEM_PROMPT.lower()
-        assert "not addressed" in SYSTEM_PROMPT.lower()
-
-    def test_system_prompt_forbids_inference(self):
-        """System prompt must explicitly forbid inference and extrapolation."""
-        prompt_lower = SYSTEM_PROMPT.lower()
-        assert "infer" in prompt_lower or "inference" in prompt_lower
-        assert "extrapolate" in prompt_lower
-
-    def test_system_prompt_requires_exact_quotes(self):
-        """System prompt must encourage exact quotes over paraphrasing."""
-        prompt_lower = SYSTEM_PROMPT.lower()
-        assert "quote" in prompt_lower or "quoted" in prompt_lower
-        assert "verbatim" in prompt_lower or "exact" in prompt_lower
-
-    def test_system_prompt_includes_output_format(self):
-        """System prompt must specify required output format."""
-        assert "## Answer" in SYSTEM_PROMPT
-        assert "## Supporting Clauses" in SYSTEM_PROMPT
-        assert "## Definitions" in SYSTEM_PROMPT
-        assert "## Citations" in SYSTEM_PROMPT
+    @pytest.mark.parametrize("tokens", _SYSTEM_TOKEN_CASES, ids=_join_tokens)
+    def test_system_prompt_mentions(self, tokens, prompt_token_presence):
+        """System prompt must mention each accuracy rule in some form."""
+        assert prompt_token_presence.system & set(tokens)
 
-    def test_system_prompt_emphasizes_accuracy_over_cost(self):
-        """System prompt must prioritize accuracy over other concerns."""
-        prompt_lower = SYSTEM_PROMPT.lower()
-        # Check for accuracy-first language
-        assert (
-            "accuracy" in prompt_lower
-            or "accurate" in prompt_lower
-            or "mandatory" in prompt_lower
-        )
-
-    def test_system_prompt_includes_verification_steps(self):
-        """System prompt must include pre-response verification."""
-        prompt_lower = SYSTEM_PROMPT.lower()
-        assert "verification" in prompt_lower or "verify" in prompt_lower
-        assert "before" in prompt_lower
-
-    def test_system_prompt_forbids_partial_answers(self):
+    def test_system_prompt_forbids_partial_answers(self, prompt_token_presence):
         """System prompt must forbid partial answers with assumptions."""
-        prompt_lower = SYSTEM_PROMPT.lower()
-        assert "partial" in prompt_lower
+        assert "partial" in prompt_token_presence.system
         # Should forbid mixing context with assumptions
-        forbidden_patterns = ["do not", "never", "must not"]
-        assert any(pattern in prompt_lower for pattern in forbidden_patterns)
+        assert _PROHIBITION_PATTERN.search(_SYS_LOWER)
 
-    def test_system_prompt_includes_forbidden_patterns(self):
+    def test_system_prompt_includes_forbidden_patterns(self, prompt_token_presence):
         """System prompt should list forbidden response patterns."""
-        prompt_lower = SYSTEM_PROMPT.lower()
         # Check for examples of what NOT to do
-        assert "forbidden" in prompt_lower or "❌" in SYSTEM_PROMPT
+        assert "forbidden" in prompt_token_presence.system or "❌" in SYSTEM_PROMPT
 
     def test_system_prompt_formatted_for_readability(self):
         """System prompt should use clear formatting for LLM parsing."""
@@ -96,20 +160,15 @@ class TestSystemPrompt:
 class TestQAPrompts:
     """Test QA prompt templates."""
 
-    def test_qa_prompt_includes_context_placeholder(self):
-        """QA prompt must include context placeholder."""
-        assert "{context}" in QA_PROMPT
-        assert "{context}" in QA_PROMPT_NO_DEFINITIONS
-
-    def test_qa_prompt_includes_question_placeholder(self):
-        """QA prompt must include question placeholder."""
-        assert "{question}" in QA_PROMPT
-        assert "{question}" in QA_PROMPT_NO_DEFINITIONS
-
-    def test_qa_prompt_includes_provider_placeholder(self):
-        """QA prompt must include provider placeholder."""
-        assert "{source}" in QA_PROMPT
-        assert "{source}" in QA_PROMPT_NO_DEFINITIONS
+    @pytest.mark.parametrize("placeholder", ["{context}", "{question}", "{source}"])
+    @pytest.mark.parametrize(
+        "prompt",
+        [QA_PROMPT, QA_PROMPT_NO_DEFINITIONS],
+        ids=["with_definitions", "no_definitions"],
+    )
+    def test_qa_prompt_includes_placeholder(self, prompt, placeholder):
+        """QA prompts must include context, question and provider placeholders."""
+        assert placeholder in prompt
 
     def test_qa_prompt_with_definitions_has_placeholder(self):
         """QA prompt with definitions must have definitions placeholder."""
@@ -122,56 +181,37 @@ class TestQAPrompts:
     def test_qa_prompt_reinforces_grounding_requirement(self):
         """QA prompt must reinforce grounding in context."""
         assert "ONLY" in QA_PROMPT or "only" in QA_PROMPT
-        assert "context" in QA_PROMPT.lower()
-
-    def test_qa_prompt_includes_refusal_format(self):
-        """QA prompt must specify refusal format."""
-        assert "not addressed" in QA_PROMPT.lower()
-        assert "not addressed" in QA_PROMPT_NO_DEFINITIONS.lower()
-
-    def test_qa_prompt_includes_verification_checklist(self):
-        """QA prompt should include pre-response verification."""
-        prompt_lower = QA_PROMPT.lower()
-        assert "verification" in prompt_lower or "verify" in prompt_lower
 
-    def test_qa_prompt_includes_refusal_criteria(self):
-        """QA prompt should list refusal criteria."""
-        prompt_lower = QA_PROMPT.lower()
-        assert "refuse" in prompt_lower or "refusal" in prompt_lower
+    @pytest.mark.parametrize("tokens", _QA_TOKEN_CASES, ids=_join_tokens)
+    def test_qa_prompt_mentions(self, tokens, prompt_token_presence):
+        """QA prompt must mention grounding, refusal and accuracy rules."""
+        assert prompt_token_presence.qa & set(tokens)
 
-    def test_qa_prompt_emphasizes_accuracy_over_helpfulness(self):
-        """QA prompt must prioritize accuracy over user satisfaction."""
-        prompt_lower = QA_PROMPT.lower()
-        assert "accuracy" in prompt_lower or "accurate" in prompt_lower
+    def test_qa_prompt_without_definitions_includes_refusal_format(self):
+        """QA prompt without definitions must specify refusal format."""
+        assert "not addressed" in _QA_ND_LOWER
 
 
 class TestRefusalMessage:
     """Test refusal message generation."""
 
-    def test_refusal_message_single_provider(self):
-        """Refusal message should be specific to single provider."""
-        msg = get_refusal_message(["cme"])
-        assert "CME" in msg
+    @pytest.mark.parametrize(
+        "sources,expected",
+        [
+            (["cme"], {"CME"}),
+            (["cme", "opra"], {"CME", "OPRA"}),
+            ([], set()),
+        ],
+        ids=["single", "multiple", "empty"],
+    )
+    def test_refusal_message_names_sources(self, sources, expected):
+        """Refusal message should name each source in uppercase, consistently."""
+        msg = get_refusal_message(sources)
+
+        assert expected <= set(re.findall(r"[A-Z]+", msg))
+        assert not any(source in msg for source in sources)
         assert "not addressed" in msg.lower()
-
-    def test_refusal_message_multiple_providers(self):
-        """Refusal message should list multiple providers."""
-        msg = get_refusal_message(["cme", "opra"])
-        assert "CME" in msg
-        assert "OPRA" in msg
-        assert "not addressed" in msg.lower()
-
-    def test_refusal_message_uppercase_providers(self):
-        """Refusal message should uppercase provider names."""
-        msg = get_refusal_message(["cme"])
-        assert "CME" in msg
-        assert "cme" not in msg  # Should be uppercase
-
-    def test_refusal_message_consistency(self):
-        """Refusal messages should be consistent."""
-        msg1 = get_refusal_message(["cme"])
-        msg2 = get_refusal_message(["cme"])
-        assert msg1 == msg2
+        assert msg == get_refusal_message(sources)
 
 
 class TestPromptIntegration:
@@ -187,7 +227,7 @@ class TestPromptIntegration:
     def test_prompts_support_definitions_workflow(self):
         """Prompts should support optional definitions."""
         # System prompt mentions definitions
-        assert "Definition" in SYSTEM_PROMPT or "definition" in SYSTEM_PROMPT.lower()
+        assert "Definition" in SYSTEM_PROMPT or "definition" in _SYS_LOWER
         # QA prompt has variant for with/without definitions
         assert "{definitions_section}" in QA_PROMPT
         assert "{definitions_section}" not in QA_PROMPT_NO_DEFINITIONS
@@ -203,33 +243,28 @@ class TestPromptIntegration:
 class TestPromptAccuracyRequirements:
     """Test that prompts enforce accuracy-first requirements."""
 
-    def test_prompt_forbids_general_knowledge(self):
+    def test_prompt_forbids_general_knowledge(self, prompt_token_presence):
         """Prompts must explicitly forbid general knowledge."""
-        combined = SYSTEM_PROMPT + QA_PROMPT
-        assert "general knowledge" in combined.lower()
-        assert "external knowledge" in combined.lower()
+        assert "general knowledge" in prompt_token_presence.combined
+        assert "external knowledge" in prompt_token_presence.combined
 
-    def test_prompt_forbids_typical_practice(self):
+    def test_prompt_forbids_typical_practice(self, prompt_token_presence):
         """Prompts should forbid 'typical practice' answers."""
-        prompt_lower = SYSTEM_PROMPT.lower()
         # Should either forbid it explicitly or set strict grounding requirements
-        assert "typical" in prompt_lower or "never" in prompt_lower
+        assert prompt_token_presence.system & {"typical", "never"}
 
-    def test_prompt_requires_complete_answers(self):
+    def test_prompt_requires_complete_answers(self, prompt_token_presence):
         """Prompts should require complete answers or refusal."""
-        combined_lower = (SYSTEM_PROMPT + QA_PROMPT).lower()
-        assert "complete" in combined_lower or "partial" in combined_lower
+        assert prompt_token_presence.combined & {"complete", "partial"}
 
-    def test_prompt_forbids_paraphrasing_definitions(self):
+    def test_prompt_forbids_paraphrasing_definitions(self, prompt_token_presence):
         """Prompts should require exact definition quotes."""
-        prompt_lower = SYSTEM_PROMPT.lower()
-        assert "exact" in prompt_lower or "verbatim" in prompt_lower
+        assert prompt_token_presence.system & {"exact", "verbatim"}
 
-    def test_prompt_includes_quality_checklist(self):
+    def test_prompt_includes_quality_checklist(self, prompt_token_presence):
         """Prompts should include quality verification checklist."""
-        combined = SYSTEM_PROMPT + QA_PROMPT
         # Should have numbered verification steps or checklist
-        assert "1." in combined or "verification" in combined.lower()
+        assert prompt_token_presence.combined & {"1.", "verification"}
 
 
 class TestPromptFormatEnforcement:
@@ -250,7 +285,7 @@ class TestPromptFormatEnforcement:
     def test_prompt_specifies_quote_format(self):
         """Prompts should specify how to format quotes."""
         # Should show quote formatting with > or similar
-        assert ">" in SYSTEM_PROMPT or "quote" in SYSTEM_PROMPT.lower()
+        assert ">" in SYSTEM_PROMPT or "quote" in _SYS_LOWER
 
     def test_prompt_specifies_citation_format(self):
         """Prompts should specify citation format."""
@@ -261,4 +296,4 @@ class TestPromptFormatEnforcement:
         """Prompts should allow optional Notes section."""
         assert "## Notes" in SYSTEM_PROMPT
         # Should indicate it's optional
-        assert "OPTIONAL" in SYSTEM_PROMPT or "omit" in SYSTEM_PROMPT.lower()
+        assert "OPTIONAL" in SYSTEM_PROMPT or "omit" in _SYS_LOWER
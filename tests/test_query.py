@@ -1,120 +1,139 @@
 # tests/test_query.py
 """Tests for query pipeline."""
 
-from unittest.mock import MagicMock
-from unittest.mock import patch
+from dataclasses import dataclass
 
 import pytest
 
-from app.prompts import QA_PROMPT
-from app.prompts import SYSTEM_PROMPT
-from app.prompts import get_refusal_message
+# Keep the module-scoped query stubs on one xdist worker
+pytestmark = pytest.mark.xdist_group("query")
+
+# Canonical collection responses shared by every mocked query. The search
+# layer copies chunk metadata before annotating it, so these are never
+# mutated; tests that need a different response assign a new dict instead.
+_MOCK_QUERY_RESULT = {
+    "ids": [["chunk_1"]],
+    "documents": [["Test document"]],
+    "metadatas": [
+        [
+            {
+                "chunk_id": "chunk_1",
+                "source": "cme",
+                "document_path": "test.pdf",
+            }
+        ]
+    ],
+    "distances": [[0.1]],
+}
+_MOCK_METADATA = {"embedding_model": "text-embedding-3-large"}
+
+
+class _StubCollection:
+    """Minimal stand-in for a ChromaDB collection."""
+
+    def __init__(self, result: dict, metadata: dict) -> None:
+        self.result = result
+        self.metadata = metadata
+
+    def query(self, **kwargs) -> dict:
+        return self.result
+
+
+class _StubClient:
+    """ChromaDB client stub that serves one collection or raises `error`."""
+
+    def __init__(self, collection: _StubCollection) -> None:
+        self.collection = collection
+        self.error: Exception | None = None
 
+    def get_collection(self, name: str, embedding_function=None) -> _StubCollection:
+        if self.error is not None:
+            raise self.error
+        return self.collection
 
-class TestPrompts:
-    """Tests for prompt templates."""
 
-    def test_system_prompt_has_required_sections(self) -> None:
-        """System prompt includes required output format."""
-        assert "## Answer" in SYSTEM_PROMPT
-        assert "## Supporting Clauses" in SYSTEM_PROMPT
-        assert "## Citations" in SYSTEM_PROMPT
-        assert "## Notes" in SYSTEM_PROMPT
+class _StubLLM:
+    """LLM stub that returns `answer` and records each generate() call."""
 
-    def test_system_prompt_requires_source_in_citations(self) -> None:
-        """System prompt requires source prefix in citations."""
-        assert "[SOURCE]" in SYSTEM_PROMPT
+    def __init__(self, answer: str) -> None:
+        self.answer = answer
+        self.calls: list[tuple[str, str]] = []
 
-    def test_system_prompt_requires_page_ranges(self) -> None:
-        """System prompt mentions page ranges."""
-        assert "Pages" in SYSTEM_PROMPT
+    def generate(self, system: str, prompt: str) -> str:
+        self.calls.append((system, prompt))
+        return self.answer
 
-    def test_qa_prompt_has_placeholders(self) -> None:
-        """QA prompt has required placeholders."""
-        assert "{source}" in QA_PROMPT
-        assert "{context}" in QA_PROMPT
-        assert "{question}" in QA_PROMPT
 
+@dataclass
+class QueryEnv:
+    """Stubs installed by the mocked_query_env fixture."""
 
-class TestRefusalMessage:
-    """Tests for refusal message generation."""
+    client: _StubClient
+    collection: _StubCollection
+    llm: _StubLLM
 
-    def test_single_provider_refusal(self) -> None:
-        """Single provider refusal message."""
-        msg = get_refusal_message(["cme"])
-        assert "CME" in msg
-        assert "not addressed" in msg.lower()
 
-    def test_multiple_provider_refusal(self) -> None:
-        """Multiple provider refusal message."""
-        msg = get_refusal_message(["cme", "ice"])
-        assert "CME" in msg
-        assert "ICE" in msg
+@pytest.fixture(scope="module", autouse=True)
+def _stub_query_constants(tmp_path_factory: pytest.TempPathFactory):
+    """Patch the query() dependencies no test inspects once per module.
 
-    def test_empty_provider_refusal(self) -> None:
-        """Empty provider list doesn't crash."""
-        msg = get_refusal_message([])
-        assert isinstance(msg, str)
+    CHROMA_DIR points at a real empty directory so query()'s index check
+    passes without patching Path.exists.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.query.OpenAIEmbeddingFunction", lambda: None)
+        mp.setattr("app.query.CHROMA_DIR", tmp_path_factory.mktemp("chroma"))
+        yield
+
+
+@pytest.fixture
+def mocked_query_env(monkeypatch: pytest.MonkeyPatch) -> QueryEnv:
+    """Stub out ChromaDB and the LLM for query().
+
+    The collection returns a single CME chunk and carries valid embedding
+    metadata; tests adjust the returned stubs for their scenario.
+    """
+    collection = _StubCollection(_MOCK_QUERY_RESULT, _MOCK_METADATA)
+    client = _StubClient(collection)
+    llm = _StubLLM("Test answer")
+
+    monkeypatch.setattr("app.query.chromadb.PersistentClient", lambda path: client)
+    monkeypatch.setattr("app.query.get_llm", lambda: llm)
+
+    return QueryEnv(client=client, collection=collection, llm=llm)
 
 
 class TestSourceNormalization:
     """Tests for provider list normalization."""
 
-    def test_empty_providers_normalized_to_default(self) -> None:
+    def test_empty_providers_normalized_to_default(
+        self, mocked_query_env: QueryEnv, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Empty providers list is normalized to DEFAULT_SOURCES."""
-        from pathlib import Path
-
         from app.config import DEFAULT_SOURCES
         from app.query import query
-
-        with (
-            patch("app.query.chromadb.PersistentClient") as mock_client,
-            patch("app.query.OpenAIEmbeddingFunction"),
-            patch("app.query.get_llm") as mock_llm,
-            patch("app.query.rerank_chunks") as mock_rerank,
-        ):
-            # Mock collection
-            mock_collection = MagicMock()
-            mock_collection.query.return_value = {
-                "ids": [["chunk_1"]],
-                "documents": [["Test document"]],
-                "metadatas": [
-                    [
-                        {
-                            "chunk_id": "chunk_1",
-                            "source": "cme",
-                            "document_path": "test.pdf",
-                        }
-                    ]
-                ],
-                "distances": [[0.1]],
-            }
-            mock_collection.metadata = {"embedding_model": "text-embedding-3-large"}
-            mock_client.return_value.get_collection.return_value = mock_collection
-
-            # Mock reranking to keep chunks (deterministic, no API call)
-            from app.rerank import ScoredChunk
-
-            def mock_rerank_fn(chunks, question):
-                scored = [
-                    ScoredChunk(
-                        chunk_id=chunk["chunk_id"],
-                        text=chunk["text"],
-                        metadata=chunk["metadata"],
-                        original_score=chunk["score"],
-                        relevance_score=2,
-                        explanation="Relevant",
-                        source=chunk.get("source", "vector"),
-                    )
-                    for chunk in chunks
-                ]
-                return scored, []
-
-            mock_rerank.side_effect = mock_rerank_fn
-
-            # Mock LLM with properly formatted response
-            mock_llm_instance = MagicMock()
-            mock_llm_instance.generate.return_value = """## Answer
+        from app.rerank import ScoredChunk
+
+        # Mock reranking to keep chunks (deterministic, no API call)
+        def mock_rerank_fn(chunks, question):
+            scored = [
+                ScoredChunk(
+                    chunk_id=chunk["chunk_id"],
+                    text=chunk["text"],
+                    metadata=chunk["metadata"],
+                    original_score=chunk["score"],
+                    relevance_score=2,
+                    explanation="Relevant",
+                    source=chunk.get("source", "vector"),
+                )
+                for chunk in chunks
+            ]
+            return scored, []
+
+        monkeypatch.setattr("app.query.rerank_chunks", mock_rerank_fn)
+
+        # Mock LLM with properly formatted response
+        mocked_query_env.llm.answer = """## Answer
 Test answer based on documents.
 
 ## Supporting Clauses
@@ -124,238 +143,124 @@ Test answer based on documents.
 ## Citations
 - **[CME] test.pdf** (Page 1): Test Section
 """
-            mock_llm.return_value = mock_llm_instance
 
-            with patch("app.query.CHROMA_DIR", Path("/tmp/test_chroma")):
-                with patch.object(Path, "exists", return_value=True):
-                    # Query with empty list should use DEFAULT_SOURCES
-                    result = query("test question", sources=[])
+        # Query with empty list should use DEFAULT_SOURCES
+        result = query("test question", sources=[])
 
-            # Should have used default providers (cme)
-            assert result["sources"] == DEFAULT_SOURCES
-            # LLM should have been called since chunks passed reranking
-            mock_llm_instance.generate.assert_called_once()
+        # Should have used default providers (cme)
+        assert result["sources"] == DEFAULT_SOURCES
+        # LLM should have been called since chunks passed reranking
+        assert len(mocked_query_env.llm.calls) == 1
 
 
 class TestEffectiveSearchMode:
     """Tests for effective_search_mode tracking."""
 
-    def test_keyword_fallback_to_vector_reported(self) -> None:
+    def test_keyword_fallback_to_vector_reported(
+        self, mocked_query_env: QueryEnv, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """When keyword mode falls back to vector, effective_search_mode reflects this."""
-        from pathlib import Path
-
         from app.query import query
 
-        # Mock ChromaDB and BM25 to simulate keyword fallback scenario
-        with (
-            patch("app.query.chromadb.PersistentClient") as mock_client,
-            patch("app.query.OpenAIEmbeddingFunction"),
-            patch("app.query.BM25Index.load") as mock_bm25_load,
-            patch("app.query.get_llm") as mock_llm,
-        ):
-            # Setup: BM25 index is missing (returns None)
-            mock_bm25_load.return_value = None
-
-            # Mock collection with vector results
-            mock_collection = MagicMock()
-            mock_collection.query.return_value = {
-                "ids": [["chunk_1"]],
-                "documents": [["Test document about fees"]],
-                "metadatas": [
-                    [
-                        {
-                            "chunk_id": "chunk_1",
-                            "source": "cme",
-                            "document_path": "test.pdf",
-                        }
-                    ]
-                ],
-                "distances": [[0.1]],
-            }
-            mock_collection.metadata = {"embedding_model": "text-embedding-3-large"}
-            mock_client.return_value.get_collection.return_value = mock_collection
-
-            # Mock LLM response
-            mock_llm_instance = MagicMock()
-            mock_llm_instance.generate.return_value = "Test answer"
-            mock_llm.return_value = mock_llm_instance
-
-            # Mock CHROMA_DIR exists
-            with patch("app.query.CHROMA_DIR", Path("/tmp/test_chroma")):
-                with patch.object(Path, "exists", return_value=True):
-                    result = query(
-                        "test question", sources=["cme"], search_mode="keyword"
-                    )
-
-            # Verify response includes both requested and effective mode
-            assert result["search_mode"] == "keyword"
-            assert result["effective_search_mode"] == "vector"
-
-    def test_vector_mode_no_fallback(self) -> None:
-        """When vector mode is used without fallback, modes match."""
-        from pathlib import Path
+        # Setup: BM25 index is missing (returns None)
+        monkeypatch.setattr("app.query.BM25Index.load", lambda source: None)
 
-        from app.query import query
+        result = query("test question", sources=["cme"], search_mode="keyword")
 
-        with (
-            patch("app.query.chromadb.PersistentClient") as mock_client,
-            patch("app.query.OpenAIEmbeddingFunction"),
-            patch("app.query.get_llm") as mock_llm,
-        ):
-            # Mock collection with vector results
-            mock_collection = MagicMock()
-            mock_collection.query.return_value = {
-                "ids": [["chunk_1"]],
-                "documents": [["Test document"]],
-                "metadatas": [
-                    [
-                        {
-                            "chunk_id": "chunk_1",
-                            "source": "cme",
-                            "document_path": "test.pdf",
-                        }
-                    ]
-                ],
-                "distances": [[0.1]],
-            }
-            mock_collection.metadata = {"embedding_model": "text-embedding-3-large"}
-            mock_client.return_value.get_collection.return_value = mock_collection
+        # Verify response includes both requested and effective mode
+        assert result["search_mode"] == "keyword"
+        assert result["effective_search_mode"] == "vector"
 
-            # Mock LLM
-            mock_llm_instance = MagicMock()
-            mock_llm_instance.generate.return_value = "Test answer"
-            mock_llm.return_value = mock_llm_instance
+    def test_vector_mode_no_fallback(self, mocked_query_env: QueryEnv) -> None:
+        """When vector mode is used without fallback, modes match."""
+        from app.query import query
 
-            with patch("app.query.CHROMA_DIR", Path("/tmp/test_chroma")):
-                with patch.object(Path, "exists", return_value=True):
-                    result = query(
-                        "test question", sources=["cme"], search_mode="vector"
-                    )
+        result = query("test question", sources=["cme"], search_mode="vector")
 
-            # Both should be vector
-            assert result["search_mode"] == "vector"
-            assert result["effective_search_mode"] == "vector"
+        # Both should be vector
+        assert result["search_mode"] == "vector"
+        assert result["effective_search_mode"] == "vector"
 
 
 class TestEmbeddingValidation:
     """Tests for embedding model and dimension validation guards."""
 
-    def test_missing_embedding_metadata_raises_error(self) -> None:
+    def test_missing_embedding_metadata_raises_error(
+        self, mocked_query_env: QueryEnv
+    ) -> None:
         """Query should fail if collection lacks embedding_model metadata (legacy index)."""
-        from pathlib import Path
-
         from app.query import query
 
-        with (
-            patch("app.query.chromadb.PersistentClient") as mock_client,
-            patch("app.query.OpenAIEmbeddingFunction"),
-        ):
-            # Mock collection with MISSING embedding metadata
-            mock_collection = MagicMock()
-            mock_collection.metadata = {}  # No embedding_model key
-            mock_client.return_value.get_collection.return_value = mock_collection
+        # Collection with MISSING embedding metadata
+        mocked_query_env.collection.metadata = {}  # No embedding_model key
 
-            with patch("app.query.CHROMA_DIR", Path("/tmp/test_chroma")):
-                with patch.object(Path, "exists", return_value=True):
-                    with pytest.raises(RuntimeError) as exc_info:
-                        query("test question", sources=["cme"])
+        with pytest.raises(RuntimeError) as exc_info:
+            query("test question", sources=["cme"])
 
-            assert "missing embedding metadata" in str(exc_info.value).lower()
-            assert "legacy" in str(exc_info.value).lower()
+        assert "missing embedding metadata" in str(exc_info.value).lower()
+        assert "legacy" in str(exc_info.value).lower()
 
-    def test_embedding_model_mismatch_raises_error(self) -> None:
+    def test_embedding_model_mismatch_raises_error(
+        self, mocked_query_env: QueryEnv
+    ) -> None:
         """Query should fail if stored embedding model differs from config."""
-        from pathlib import Path
-
         from app.query import query
 
-        with (
-            patch("app.query.chromadb.PersistentClient") as mock_client,
-            patch("app.query.OpenAIEmbeddingFunction"),
-        ):
-            # Mock collection with DIFFERENT embedding model (e.g., old Ollama model)
-            mock_collection = MagicMock()
-            mock_collection.metadata = {"embedding_model": "nomic-embed-text"}
-            mock_client.return_value.get_collection.return_value = mock_collection
+        # Collection with DIFFERENT embedding model (e.g., old Ollama model)
+        mocked_query_env.collection.metadata = {"embedding_model": "nomic-embed-text"}
 
-            with patch("app.query.CHROMA_DIR", Path("/tmp/test_chroma")):
-                with patch.object(Path, "exists", return_value=True):
-                    with pytest.raises(RuntimeError) as exc_info:
-                        query("test question", sources=["cme"])
+        with pytest.raises(RuntimeError) as exc_info:
+            query("test question", sources=["cme"])
 
-            assert "mismatch" in str(exc_info.value).lower()
-            assert "nomic-embed-text" in str(exc_info.value)
+        assert "mismatch" in str(exc_info.value).lower()
+        assert "nomic-embed-text" in str(exc_info.value)
 
-    def test_embedding_dimensions_mismatch_raises_error(self) -> None:
+    def test_embedding_dimensions_mismatch_raises_error(
+        self, mocked_query_env: QueryEnv
+    ) -> None:
         """Query should fail if stored dimensions differ from config."""
-        from pathlib import Path
-
         from app.query import query
 
-        with (
-            patch("app.query.chromadb.PersistentClient") as mock_client,
-            patch("app.query.OpenAIEmbeddingFunction"),
-        ):
-            # Mock collection with correct model but WRONG dimensions
-            mock_collection = MagicMock()
-            mock_collection.metadata = {
-                "embedding_model": "text-embedding-3-large",
-                "embedding_dimensions": 768,  # Wrong! Should be 3072
-            }
-            mock_client.return_value.get_collection.return_value = mock_collection
+        # Collection with correct model but WRONG dimensions
+        mocked_query_env.collection.metadata = {
+            "embedding_model": "text-embedding-3-large",
+            "embedding_dimensions": 768,  # Wrong! Should be 3072
+        }
 
-            with patch("app.query.CHROMA_DIR", Path("/tmp/test_chroma")):
-                with patch.object(Path, "exists", return_value=True):
-                    with pytest.raises(RuntimeError) as exc_info:
-                        query("test question", sources=["cme"])
+        with pytest.raises(RuntimeError) as exc_info:
+            query("test question", sources=["cme"])
 
-            assert "dimensions mismatch" in str(exc_info.value).lower()
-            assert "768" in str(exc_info.value)
+        assert "dimensions mismatch" in str(exc_info.value).lower()
+        assert "768" in str(exc_info.value)
 
-    def test_collection_not_found_skips_provider(self) -> None:
+    def test_collection_not_found_skips_provider(
+        self, mocked_query_env: QueryEnv
+    ) -> None:
         """Missing collection should skip provider and return refusal (NotFoundError)."""
-        from pathlib import Path
-
         from chromadb.errors import NotFoundError
 
         from app.query import query
 
-        with (
-            patch("app.query.chromadb.PersistentClient") as mock_client,
-            patch("app.query.OpenAIEmbeddingFunction"),
-        ):
-            # Simulate collection not found
-            mock_client.return_value.get_collection.side_effect = NotFoundError(
-                "Collection not found"
-            )
+        # Simulate collection not found
+        mocked_query_env.client.error = NotFoundError("Collection not found")
 
-            with patch("app.query.CHROMA_DIR", Path("/tmp/test_chroma")):
-                with patch.object(Path, "exists", return_value=True):
-                    result = query("test question", sources=["cme"])
+        result = query("test question", sources=["cme"])
 
-            # Should return refusal response (no chunks retrieved)
-            assert result["chunks_retrieved"] == 0
-            assert "not addressed" in result["answer"].lower()
+        # Should return refusal response (no chunks retrieved)
+        assert result["chunks_retrieved"] == 0
+        assert "not addressed" in result["answer"].lower()
 
-    def test_collection_not_found_valueerror_skips_provider(self) -> None:
+    def test_collection_not_found_valueerror_skips_provider(
+        self, mocked_query_env: QueryEnv
+    ) -> None:
         """Missing collection should skip provider and return refusal (ValueError for legacy ChromaDB)."""
-        from pathlib import Path
-
         from app.query import query
 
-        with (
-            patch("app.query.chromadb.PersistentClient") as mock_client,
-            patch("app.query.OpenAIEmbeddingFunction"),
-        ):
-            # Simulate legacy ChromaDB ValueError
-            mock_client.return_value.get_collection.side_effect = ValueError(
-                "Collection not found"
-            )
-
-            with patch("app.query.CHROMA_DIR", Path("/tmp/test_chroma")):
-                with patch.object(Path, "exists", return_value=True):
-                    result = query("test question", sources=["cme"])
-
-            # Should return refusal response (no chunks retrieved)
-            assert result["chunks_retrieved"] == 0
-            assert "not addressed" in result["answer"].lower()
+        # Simulate legacy ChromaDB ValueError
+        mocked_query_env.client.error = ValueError("Collection not found")
+
+        result = query("test question", sources=["cme"])
+
+        # Should return refusal response (no chunks retrieved)
+        assert result["chunks_retrieved"] == 0
+        assert "not addressed" in result["answer"].lower()
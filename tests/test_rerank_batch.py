@@ -0,0 +1,303 @@
+"""Tests for offline reranking through the OpenAI Batch API."""
+
+import json
+from typing import Any
+
+import httpx
+import pytest
+import respx
+
+from app.llm import LLMConnectionError
+from app.rerank import failed_score
+from app.rerank_batch import build_batch_requests
+from app.rerank_batch import parse_batch_output
+from app.rerank_batch import rerank_chunks_batch
+
+_API = "https://api.openai.com/v1"
+
+
+def _chunks(count: int) -> list[dict]:
+    return [
+        {
+            "chunk_id": f"chunk_{i}",
+            "text": f"Clause {i} about redistribution fees.",
+            "metadata": {},
+            "score": 0.5,
+            "source": "vector",
+        }
+        for i in range(count)
+    ]
+
+
+def _output_line(chunk_id: str, content: str, status_code: int = 200) -> str:
+    """One Batch API output record wrapping a chat completion."""
+    body = {
+        "id": f"chatcmpl-{chunk_id}",
+        "object": "chat.completion",
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }
+        ],
+    }
+    return json.dumps(
+        {
+            "id": f"batch_req_{chunk_id}",
+            "custom_id": chunk_id,
+            "response": {"status_code": status_code, "body": body},
+            "error": None,
+        }
+    )
+
+
+def _batch(status: str, output_file_id: str | None = None, **fields: Any) -> dict:
+    return {
+        "id": "batch_test",
+        "object": "batch",
+        "endpoint": "/v1/chat/completions",
+        "input_file_id": "file_input",
+        "completion_window": "24h",
+        "status": status,
+        "output_file_id": output_file_id,
+        "created_at": 0,
+        **fields,
+    }
+
+
+@pytest.fixture
+def batch_api(respx_mock: respx.MockRouter, monkeypatch: pytest.MonkeyPatch):
+    """Mock the Files and Batches endpoints used by rerank_chunks_batch.
+
+    The batch reports in_progress on the first retrieve and completed on the
+    second. Tests mock the "content" route with the output file they need.
+    Deleting any file succeeds.
+    """
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+
+    routes = respx_mock
+    routes.post(f"{_API}/files", name="upload").mock(
+        return_value=httpx.Response(
+            200,
+            json={
+                "id": "file_input",
+                "object": "file",
+                "bytes": 0,
+                "created_at": 0,
+                "filename": "rerank_batch.jsonl",
+                "purpose": "batch",
+                "status": "processed",
+            },
+        )
+    )
+    routes.post(f"{_API}/batches", name="create").mock(
+        return_value=httpx.Response(200, json=_batch("validating"))
+    )
+    routes.get(f"{_API}/batches/batch_test", name="retrieve").mock(
+        side_effect=[
+            httpx.Response(200, json=_batch("in_progress")),
+            httpx.Response(200, json=_batch("completed", "file_output")),
+        ]
+    )
+    routes.get(f"{_API}/files/file_output/content", name="content")
+    routes.delete(url__regex=rf"{_API}/files/[^/]+$", name="delete").mock(
+        return_value=httpx.Response(
+            200, json={"id": "file", "object": "file", "deleted": True}
+        )
+    )
+    routes.post(f"{_API}/chat/completions", name="chat")
+    return routes
+
+
+def _deleted_file_ids(routes: respx.MockRouter) -> list[str]:
+    return [call.request.url.path.rsplit("/", 1)[1] for call in routes["delete"].calls]
+
+
+class TestBuildBatchRequests:
+    """Tests for the Batch API input file."""
+
+    def test_one_chat_completion_request_per_chunk(self):
+        """Each line targets chat completions with the chunk_id as custom_id."""
+        jsonl = build_batch_requests(_chunks(3), "What are the fees?", model="m")
+        records = [json.loads(line) for line in jsonl.splitlines()]
+
+        assert [r["custom_id"] for r in records] == ["chunk_0", "chunk_1", "chunk_2"]
+        for record in records:
+            assert record["method"] == "POST"
+            assert record["url"] == "/v1/chat/completions"
+            assert record["body"]["model"] == "m"
+            assert record["body"]["temperature"] == 0.0
+            assert "What are the fees?" in record["body"]["messages"][1]["content"]
+
+    def test_duplicate_chunk_ids_rejected(self):
+        """Output lines are matched by custom_id, so ids must be unique."""
+        chunks = _chunks(3) + _chunks(2)
+
+        with pytest.raises(ValueError, match="chunk_0, chunk_1"):
+            build_batch_requests(chunks, "q")
+
+
+class TestParseBatchOutput:
+    """Tests for reading the Batch API output file."""
+
+    def test_failed_request_falls_back_to_score_one(self):
+        """A request that errored inside the batch scores 1, not 0."""
+        output = "\n".join(
+            [
+                _output_line("ok", "Score: 3\nExplanation: ok"),
+                _output_line("bad", "", status_code=500),
+            ]
+        )
+        scores = parse_batch_output(output, include_explanations=True)
+
+        assert scores["ok"] == (3, "ok")
+        assert scores["bad"][0] == 1
+        assert scores["bad"][1].startswith(failed_score("")[1])
+
+
+class TestRerankChunksBatch:
+    """Tests for rerank_chunks_batch against a mocked Batch API."""
+
+    def test_fifty_chunks_use_one_batch(self, batch_api, monkeypatch):
+        """All chunks go through one batch and no per-chunk chat completions."""
+        monkeypatch.setattr("app.rerank_batch.time.sleep", lambda seconds: None)
+        chunks = _chunks(50)
+        output = "\n".join(
+            _output_line(chunk["chunk_id"], f"Score: {i % 4}")
+            for i, chunk in enumerate(chunks)
+        )
+        batch_api["content"].mock(return_value=httpx.Response(200, text=output))
+
+        kept, dropped = rerank_chunks_batch(
+            chunks, "What are the fees?", min_score=2, max_chunks=100
+        )
+
+        assert batch_api["create"].call_count == 1
+        assert batch_api["chat"].call_count == 0
+        assert batch_api["retrieve"].call_count == 2
+        uploaded = batch_api["upload"].calls.last.request.content
+        assert uploaded.count(b'"custom_id"') == 50
+        assert len(kept) + len(dropped) == 50
+        assert all(chunk.relevance_score >= 2 for chunk in kept)
+        assert kept[0].relevance_score == 3
+        assert _deleted_file_ids(batch_api) == ["file_input", "file_output"]
+
+    def test_chunk_missing_from_output_scores_one(self, batch_api, monkeypatch):
+        """Chunks without an output line keep the score_chunk fallback of 1."""
+        monkeypatch.setattr("app.rerank_batch.time.sleep", lambda seconds: None)
+        output = _output_line("chunk_0", "Score: 3")
+        batch_api["content"].mock(return_value=httpx.Response(200, text=output))
+
+        kept, dropped = rerank_chunks_batch(_chunks(2), "q", min_score=2)
+
+        assert [c.chunk_id for c in kept] == ["chunk_0"]
+        assert dropped[0].chunk_id == "chunk_1"
+        assert dropped[0].relevance_score == 1
+        assert dropped[0].explanation == failed_score("missing from batch output")[1]
+
+    def test_failed_batch_raises(self, batch_api, monkeypatch):
+        """A batch that ends without completing surfaces as LLMConnectionError."""
+        monkeypatch.setattr("app.rerank_batch.time.sleep", lambda seconds: None)
+        batch_api["retrieve"].mock(
+            side_effect=None, return_value=httpx.Response(200, json=_batch("failed"))
+        )
+
+        with pytest.raises(LLMConnectionError, match="failed"):
+            rerank_chunks_batch(_chunks(2), "q")
+
+        assert _deleted_file_ids(batch_api) == ["file_input"]
+
+    def test_failed_batch_reports_errors(self, batch_api, monkeypatch):
+        """Batch errors reach the exception and the error file is read."""
+        monkeypatch.setattr("app.rerank_batch.time.sleep", lambda seconds: None)
+        failed = _batch(
+            "failed",
+            error_file_id="file_errors",
+            errors={
+                "object": "list",
+                "data": [{"code": "invalid_json_line", "message": "Bad line"}],
+            },
+        )
+        batch_api["retrieve"].mock(
+            side_effect=None, return_value=httpx.Response(200, json=failed)
+        )
+        error_file = batch_api.get(f"{_API}/files/file_errors/content").mock(
+            return_value=httpx.Response(200, text="")
+        )
+
+        with pytest.raises(LLMConnectionError, match="invalid_json_line: Bad line"):
+            rerank_chunks_batch(_chunks(2), "q")
+
+        assert error_file.call_count == 1
+        assert _deleted_file_ids(batch_api) == ["file_input", "file_errors"]
+
+    def test_failed_requests_read_from_error_file(self, batch_api, monkeypatch):
+        """Requests that failed in a completed batch keep their error detail."""
+        monkeypatch.setattr("app.rerank_batch.time.sleep", lambda seconds: None)
+        completed = _batch(
+            "completed",
+            "file_output",
+            error_file_id="file_errors",
+            request_counts={"completed": 1, "failed": 1, "total": 2},
+        )
+        batch_api["retrieve"].mock(
+            side_effect=None, return_value=httpx.Response(200, json=completed)
+        )
+        batch_api["content"].mock(
+            return_value=httpx.Response(200, text=_output_line("chunk_0", "Score: 3"))
+        )
+        batch_api.get(f"{_API}/files/file_errors/content").mock(
+            return_value=httpx.Response(
+                200, text=_output_line("chunk_1", "", status_code=429)
+            )
+        )
+
+        kept, dropped = rerank_chunks_batch(_chunks(2), "q", min_score=2)
+
+        assert [c.chunk_id for c in kept] == ["chunk_0"]
+        assert dropped[0].relevance_score == 1
+        assert "missing from batch output" not in dropped[0].explanation
+        assert _deleted_file_ids(batch_api) == [
+            "file_input",
+            "file_output",
+            "file_errors",
+        ]
+
+    def test_duplicate_chunk_ids_raise_before_upload(self, batch_api):
+        """Duplicate ids are rejected before anything is sent to the API."""
+        with pytest.raises(ValueError, match="Duplicate chunk_ids"):
+            rerank_chunks_batch(_chunks(2) + _chunks(1), "q")
+
+        assert batch_api["upload"].call_count == 0
+        assert batch_api["create"].call_count == 0
+
+    def test_timeout_cancels_batch(self, batch_api):
+        """A batch still running at max_wait is cancelled before raising."""
+        cancel = batch_api.post(f"{_API}/batches/batch_test/cancel").mock(
+            return_value=httpx.Response(200, json=_batch("cancelling"))
+        )
+
+        with pytest.raises(LLMConnectionError, match="did not finish"):
+            rerank_chunks_batch(_chunks(2), "q", max_wait=0)
+
+        assert cancel.call_count == 1
+        assert batch_api["content"].call_count == 0
+        assert _deleted_file_ids(batch_api) == ["file_input"]
+
+    def test_timeout_raises_when_cancel_fails(self, batch_api):
+        """A failed cancel is logged; the caller still sees the timeout."""
+        cancel = batch_api.post(f"{_API}/batches/batch_test/cancel").mock(
+            return_value=httpx.Response(400, json={"error": {"message": "no"}})
+        )
+
+        with pytest.raises(LLMConnectionError, match="did not finish"):
+            rerank_chunks_batch(_chunks(2), "q", max_wait=0)
+
+        assert cancel.called
+
+    def test_empty_chunks_skip_api(self, batch_api):
+        """No chunks means no upload and no batch."""
+        assert rerank_chunks_batch([], "q") == ([], [])
+        assert batch_api["upload"].call_count == 0
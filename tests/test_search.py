@@ -1,15 +1,33 @@
 """Tests for hybrid search implementation."""
 
+import pickle
+import random
+import re
+import time
 from pathlib import Path
+from typing import Any
 
 import pytest
+from hypothesis import given
+from hypothesis import strategies as st
 
+from app.search import BM25_INDEX_MAGIC
 from app.search import BM25Index
 from app.search import SearchMode
 from app.search import merge_results_rrf
 from app.search import rrf_score
 from app.search import tokenize
 
+# What a BM25 token may look like: two or more lowercase ASCII alphanumerics
+_TOKEN_SHAPE_PATTERN = re.compile(r"[a-z0-9]{2,}")
+
+
+def _write_index(path: Path, magic: bytes, payload: dict[str, Any]) -> None:
+    """Write an index file by hand, for testing how load() validates it."""
+    with open(path, "wb") as f:
+        f.write(magic)
+        pickle.dump(payload, f)
+
 
 class TestTokenize:
     """Tests for tokenization function."""
@@ -53,6 +71,14 @@ class TestTokenize:
         tokens = tokenize("!@#$%^&*()")
         assert tokens == []
 
+    @given(st.text())
+    def test_tokens_are_lowercase_alphanumeric(self, text: str) -> None:
+        """Every token is 2+ lowercase ASCII letters or digits from the text."""
+        lowered = text.lower()
+        for token in tokenize(text):
+            assert _TOKEN_SHAPE_PATTERN.fullmatch(token)
+            assert token in lowered
+
 
 class TestRRFScore:
     """Tests for Reciprocal Rank Fusion scoring."""
@@ -81,6 +107,21 @@ class TestRRFScore:
         score = rrf_score(1000, k=60)
         assert score < 0.001
 
+    @given(
+        st.integers(min_value=1, max_value=10_000),
+        st.integers(min_value=1, max_value=10_000),
+        st.integers(min_value=0, max_value=1_000),
+    )
+    def test_score_strictly_decreases_with_rank(
+        self, rank_a: int, rank_b: int, k: int
+    ) -> None:
+        """A better (lower) rank always scores higher, for any k."""
+        if rank_a < rank_b:
+            assert rrf_score(rank_a, k) > rrf_score(rank_b, k)
+        elif rank_a == rank_b:
+            assert rrf_score(rank_a, k) == rrf_score(rank_b, k)
+        assert 0 < rrf_score(rank_a, k) <= 1 / (k + 1)
+
 
 class TestMergeResultsRRF:
     """Tests for RRF merge function."""
@@ -138,6 +179,40 @@ class TestMergeResultsRRF:
         assert merged_k60[0][0] == "doc1"
         assert merged_k10[0][0] == "doc1"
 
+    @pytest.mark.parametrize("k", [0, 1, 60])
+    def test_matches_rrf_score_reference(self, k: int) -> None:
+        """Merged scores and order match summing rrf_score per list."""
+        rng = random.Random(k)
+        vector_results = [(f"doc{i}", 0.0) for i in rng.sample(range(300), 200)]
+        bm25_results = [(f"doc{i}", 0.0) for i in rng.sample(range(300), 200)]
+
+        expected: dict[str, float] = {}
+        for results in (vector_results, bm25_results):
+            for rank, (chunk_id, _) in enumerate(results, start=1):
+                expected[chunk_id] = expected.get(chunk_id, 0) + rrf_score(rank, k)
+        reference = sorted(expected.items(), key=lambda x: x[1], reverse=True)
+
+        assert merge_results_rrf(vector_results, bm25_results, k=k) == reference
+
+
+@pytest.fixture(scope="class")
+def sample_index() -> BM25Index:
+    """Three-document index built once per class for read-only query tests.
+
+    Tests that add documents or clear the index build their own instead.
+    """
+    index = BM25Index("test")
+    index.add_documents(
+        ["chunk1", "chunk2", "chunk3"],
+        [
+            "The quick brown fox jumps over the lazy dog",
+            "The lazy cat sleeps all day",
+            "Python programming is fun and powerful",
+        ],
+    )
+    index.build()
+    return index
+
 
 class TestBM25Index:
     """Tests for BM25 index class."""
@@ -151,23 +226,12 @@ class TestBM25Index:
         )
         index.build()
 
-        assert len(index.chunk_ids) == 2
+        assert len(index) == 2
         assert index.bm25 is not None
 
-    def test_query_returns_results(self) -> None:
+    def test_query_returns_results(self, sample_index: BM25Index) -> None:
         """Query returns matching documents."""
-        index = BM25Index("test")
-        index.add_documents(
-            ["chunk1", "chunk2", "chunk3"],
-            [
-                "The quick brown fox jumps over the lazy dog",
-                "The lazy cat sleeps all day",
-                "Python programming is fun and powerful",
-            ],
-        )
-        index.build()
-
-        results = index.query("lazy dog", top_k=2)
+        results = sample_index.query("lazy dog", top_k=2)
 
         assert len(results) <= 2
         # First result should be chunk1 (has both "lazy" and "dog")
@@ -181,13 +245,9 @@ class TestBM25Index:
         results = index.query("test query")
         assert results == []
 
-    def test_query_no_matches(self) -> None:
+    def test_query_no_matches(self, sample_index: BM25Index) -> None:
         """Query with no matching tokens returns empty results."""
-        index = BM25Index("test")
-        index.add_documents(["chunk1"], ["apple banana cherry"])
-        index.build()
-
-        results = index.query("xyz123")
+        results = sample_index.query("xyz123")
         assert results == []
 
     def test_add_documents_length_mismatch(self) -> None:
@@ -230,152 +290,195 @@ class TestBM25Index:
         )
         index.build()
 
-        assert len(index.chunk_ids) == 3
+        assert len(index) == 3
         # Query for terms unique to chunk1
         results = index.query("first legal licensing", top_k=1)
         assert len(results) > 0
         assert results[0][0] == "chunk1"
 
+    def test_query_matches_bm25okapi_ranking(self) -> None:
+        """Query ranks and scores exactly as BM25Okapi.get_scores would."""
+        rng = random.Random(0)
+        vocab = [f"term{i}" for i in range(50)] + ["the", "and", "of"] * 10
+        documents = [
+            " ".join(rng.choices(vocab, k=rng.randint(3, 30))) for _ in range(200)
+        ]
+        index = BM25Index("test")
+        index.add_documents([f"chunk{i}" for i in range(200)], documents)
+        index.build()
+        assert index.bm25 is not None
+
+        for _ in range(50):
+            question = " ".join(rng.choices(vocab, k=rng.randint(1, 6)))
+            reference = index.bm25.get_scores(tokenize(question))
+            ranked = sorted(enumerate(reference), key=lambda x: x[1], reverse=True)
+            expected = [
+                (index.chunk_ids[i], score) for i, score in ranked[:10] if score > 0
+            ]
+            assert index.query(question, top_k=10) == expected
+
+
+@pytest.fixture(scope="class")
+def large_index() -> BM25Index:
+    """Synthetic 10k-document index with a 5k-term vocabulary."""
+    rng = random.Random(0)
+    vocab = [f"term{i}" for i in range(5000)]
+    index = BM25Index("perf")
+    index.add_documents(
+        [f"chunk{i}" for i in range(10_000)],
+        [" ".join(rng.choices(vocab, k=50)) for _ in range(10_000)],
+    )
+    index.build()
+    return index
+
+
+@pytest.mark.perf
+class TestBM25Performance:
+    """Wall-clock budgets for BM25 on a 10k-document corpus (pytest -m perf)."""
+
+    def test_build_budget(self, large_index: BM25Index) -> None:
+        """Rebuilding a 10k-document index stays under one second."""
+        start = time.perf_counter()
+        large_index.build()
+        assert time.perf_counter() - start < 1.0
+
+    def test_query_budget(self, large_index: BM25Index) -> None:
+        """A hundred six-token queries stay under half a second."""
+        start = time.perf_counter()
+        for _ in range(100):
+            large_index.query("term1 term2 term3 term4 term5 term6", top_k=10)
+        assert time.perf_counter() - start < 0.5
+
+
+class TestSearchBenchmarks:
+    """Per-query hot paths, measured under `pytest --codspeed`.
+
+    Without --codspeed each benchmark runs once, like a normal test.
+    """
+
+    def test_tokenize_benchmark(self, benchmark) -> None:
+        """Tokenize a 400-word question."""
+        tokens = benchmark(tokenize, "The quick brown fox " * 100)
+        assert len(tokens) == 400
+
+    def test_rrf_score_benchmark(self, benchmark) -> None:
+        """Score a thousand ranks."""
+        total = benchmark(lambda: sum(rrf_score(rank) for rank in range(1, 1001)))
+        assert total > 0
+
+    def test_merge_results_rrf_benchmark(self, benchmark) -> None:
+        """Merge two overlapping thousand-result lists."""
+        vector = [(f"doc{i}", 1.0 / i) for i in range(1, 1001)]
+        bm25 = [(f"doc{i}", 1.0 / i) for i in range(500, 1500)]
+        merged = benchmark(merge_results_rrf, vector, bm25)
+        assert len(merged) == 1499
+
 
 class TestSearchMode:
     """Tests for SearchMode enum."""
 
-    def test_valid_modes(self) -> None:
-        """All valid modes can be created."""
-        assert SearchMode("vector") == SearchMode.VECTOR
-        assert SearchMode("keyword") == SearchMode.KEYWORD
-        assert SearchMode("hybrid") == SearchMode.HYBRID
-
-    def test_invalid_mode_raises(self) -> None:
-        """Invalid mode raises ValueError."""
+    def test_modes(self) -> None:
+        """Exactly the three documented modes exist; anything else is rejected."""
+        assert {m.value for m in SearchMode} == {"vector", "keyword", "hybrid"}
         with pytest.raises(ValueError):
             SearchMode("invalid")
 
-    def test_mode_values(self) -> None:
-        """Mode values are correct strings."""
-        assert SearchMode.VECTOR.value == "vector"
-        assert SearchMode.KEYWORD.value == "keyword"
-        assert SearchMode.HYBRID.value == "hybrid"
+
+@pytest.fixture(scope="module")
+def prebuilt_bm25(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Build and save one canonical BM25 index per module.
+
+    The index for "test_provider" holds three documents and is written to a
+    fresh directory, which is returned. Tests point app.search.BM25_INDEX_DIR
+    at it (with monkeypatch) and load the index instead of rebuilding it.
+    """
+    index_dir = tmp_path_factory.mktemp("bm25")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.search.BM25_INDEX_DIR", index_dir)
+        index = BM25Index("test_provider")
+        index.add_documents(
+            ["chunk1", "chunk2", "chunk3"],
+            [
+                "The quick brown fox jumps over the lazy dog in the forest",
+                "The lazy sleepy dog rests by the warm fireplace all day long",
+                "Python programming language is powerful and easy to learn",
+            ],
+        )
+        index.build()
+        index.save()
+    return index_dir
 
 
 class TestBM25IndexPersistence:
     """Tests for BM25 index persistence (save/load)."""
 
-    def test_save_creates_file(self, tmp_path: Path) -> None:
+    def test_save_creates_file(self, prebuilt_bm25: Path) -> None:
         """Save creates a pickle file."""
-        import app.search as search_module
-
-        # Temporarily override index directory
-        original_dir = search_module.BM25_INDEX_DIR
-        search_module.BM25_INDEX_DIR = tmp_path
+        assert (prebuilt_bm25 / "test_provider_index.pkl").exists()
 
-        try:
-            index = BM25Index("test_provider")
-            index.add_documents(["chunk1"], ["test document"])
-            index.build()
-            index.save()
+    def test_save_uses_highest_pickle_protocol(self, prebuilt_bm25: Path) -> None:
+        """Save pickles with the highest protocol, straight after the magic."""
+        data = (prebuilt_bm25 / "test_provider_index.pkl").read_bytes()
+        body = data.removeprefix(BM25_INDEX_MAGIC)
 
-            assert (tmp_path / "test_provider_index.pkl").exists()
-        finally:
-            search_module.BM25_INDEX_DIR = original_dir
+        # Protocol 2+ pickles open with the PROTO opcode and the protocol number
+        assert body[:2] == pickle.PROTO + bytes([pickle.HIGHEST_PROTOCOL])
 
-    def test_load_restores_index(self, tmp_path: Path) -> None:
+    def test_load_restores_index(
+        self, prebuilt_bm25: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Load restores a saved index."""
-        import app.search as search_module
-
-        original_dir = search_module.BM25_INDEX_DIR
-        search_module.BM25_INDEX_DIR = tmp_path
-        search_module.BM25_INDEX_DIR = tmp_path  # type: ignore[assignment]
-
-        try:
-            # Create and save index with longer documents
-            index = BM25Index("test_provider")
-            index.add_documents(
-                ["chunk1", "chunk2", "chunk3"],
-                [
-                    "The quick brown fox jumps over the lazy dog in the forest",
-                    "The lazy sleepy dog rests by the warm fireplace all day long",
-                    "Python programming language is powerful and easy to learn",
-                ],
-            )
-            index.build()
-            index.save()
+        monkeypatch.setattr("app.search.BM25_INDEX_DIR", prebuilt_bm25)
 
-            # Load and verify
-            loaded = BM25Index.load("test_provider")
+        loaded = BM25Index.load("test_provider")
 
-            assert loaded is not None
-            assert len(loaded.chunk_ids) == 3
-            assert loaded.bm25 is not None
+        assert loaded is not None
+        assert len(loaded) == 3
+        assert loaded.bm25 is not None
 
-            # Verify query works with multi-word query for better BM25 match
-            results = loaded.query("quick brown fox", top_k=1)
-            assert len(results) > 0
-            assert results[0][0] == "chunk1"
-        finally:
-            search_module.BM25_INDEX_DIR = original_dir
+        # Verify query works with multi-word query for better BM25 match
+        results = loaded.query("quick brown fox", top_k=1)
+        assert len(results) > 0
+        assert results[0][0] == "chunk1"
 
-    def test_load_nonexistent_returns_none(self, tmp_path: Path) -> None:
+    def test_load_nonexistent_returns_none(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Load returns None for nonexistent index."""
-        import app.search as search_module
-
-        original_dir = search_module.BM25_INDEX_DIR
-        search_module.BM25_INDEX_DIR = tmp_path
+        monkeypatch.setattr("app.search.BM25_INDEX_DIR", tmp_path)
 
-        try:
-            loaded = BM25Index.load("nonexistent_provider")
-            assert loaded is None
-        finally:
-            search_module.BM25_INDEX_DIR = original_dir
+        loaded = BM25Index.load("nonexistent_provider")
+        assert loaded is None
 
-    def test_load_validates_magic_bytes(self, tmp_path: Path) -> None:
+    def test_load_validates_magic_bytes(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Load rejects files with invalid magic bytes."""
-        import app.search as search_module
-
-        original_dir = search_module.BM25_INDEX_DIR
-        search_module.BM25_INDEX_DIR = tmp_path
-
-        try:
-            # Create a file with invalid magic bytes
-            index_path = tmp_path / "test_provider_index.pkl"
-            with open(index_path, "wb") as f:
-                f.write(b"INVALID!")
-                import pickle
-
-                pickle.dump({"chunk_ids": []}, f)
+        monkeypatch.setattr("app.search.BM25_INDEX_DIR", tmp_path)
+        _write_index(
+            tmp_path / "test_provider_index.pkl", b"INVALID!", {"chunk_ids": []}
+        )
 
-            loaded = BM25Index.load("test_provider")
-            assert loaded is None  # Should reject due to invalid magic
-        finally:
-            search_module.BM25_INDEX_DIR = original_dir
+        loaded = BM25Index.load("test_provider")
+        assert loaded is None  # Should reject due to invalid magic
 
-    def test_load_validates_document_count(self, tmp_path: Path) -> None:
+    def test_load_validates_document_count(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Load rejects files with mismatched document count."""
-        import app.search as search_module
-
-        original_dir = search_module.BM25_INDEX_DIR
-        search_module.BM25_INDEX_DIR = tmp_path
-
-        try:
-            # Create index with corrupted document count
-            index_path = tmp_path / "test_provider_index.pkl"
-            with open(index_path, "wb") as f:
-                f.write(search_module.BM25_INDEX_MAGIC)
-                import pickle
-
-                pickle.dump(
-                    {
-                        "version": "1.0",
-                        "source": "test_provider",
-                        "document_count": 999,  # Intentionally wrong
-                        "chunk_ids": ["chunk1"],
-                        "documents": ["test"],
-                        "tokenized_corpus": [["test"]],
-                    },
-                    f,
-                )
-
-            loaded = BM25Index.load("test_provider")
-            assert loaded is None  # Should reject due to count mismatch
-        finally:
-            search_module.BM25_INDEX_DIR = original_dir
+        monkeypatch.setattr("app.search.BM25_INDEX_DIR", tmp_path)
+        _write_index(
+            tmp_path / "test_provider_index.pkl",
+            BM25_INDEX_MAGIC,
+            {
+                "version": "1.0",
+                "source": "test_provider",
+                "document_count": 999,  # Intentionally wrong
+                "chunk_ids": ["chunk1"],
+                "documents": ["test"],
+                "tokenized_corpus": [["test"]],
+            },
+        )
+
+        loaded = BM25Index.load("test_provider")
+        assert loaded is None  # Should reject due to count mismatch
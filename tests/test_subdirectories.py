@@ -1,47 +1,189 @@
 """Test subdirectory support for ingestion pipeline."""
 
+import os
 import shutil
 from pathlib import Path
+from pathlib import PurePosixPath
 
 import pytest
 
+from app.chunking import Chunk
 from app.chunking import chunk_document
 from app.chunking import save_chunks_artifacts
+from app.discovery import DocumentFile
+from app.discovery import find_document_files
+from app.extract import ExtractedDocument
+from app.extract import PageContent
+from app.extract import encode_relative_path
 from app.extract import save_extraction_artifacts
 
+# Keep the filesystem tests on one xdist worker so the module-scoped trees
+# are built once under `pytest -n auto --dist=loadgroup`
+pytestmark = pytest.mark.xdist_group("fs")
+
+# Relative document paths, parsed once; artifact names encode them posix-style
+_FEES_SCHEDULE = PurePosixPath("Fees/schedule.pdf")
+_FEES_AGREEMENT = PurePosixPath("Fees/agreement.pdf")
+_AGREEMENTS_AGREEMENT = PurePosixPath("Agreements/agreement.pdf")
+_AGREEMENTS_LICENSE = PurePosixPath("Agreements/license.pdf")
+
+# Text long enough that chunk_document() produces at least one chunk
+_LONG_FEES_TEXT = "Section 1: Fees and Charges\n\n" + " ".join(
+    ["This is test content."] * 50
+)
+
+
+def _touch(path: Path, data: bytes = b"content") -> None:
+    """Write data to path with raw os calls, skipping the text codec layer."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def _write_tree(root: Path, files: list[str]) -> Path:
+    """Create each relative path under root and return root.
+
+    Paths ending in "/" are created as empty directories; the rest are files.
+    Each parent directory is created once, however many files it holds.
+    """
+    made: set[Path] = set()
+    for relative in files:
+        path = root / relative
+        parent = path if relative.endswith("/") else path.parent
+        if parent not in made:
+            os.makedirs(parent, exist_ok=True)
+            made.add(parent)
+        if not relative.endswith("/"):
+            _touch(path)
+    return root
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Hardlink src to dst, copying instead when linking is not possible.
+
+    Linking moves no file data; it fails across filesystems or where the
+    filesystem does not support hardlinks, which copy2 handles.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+@pytest.fixture(scope="module")
+def subdir_fixture_tree(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Copy of tests/fixtures/subdir_test as a provider raw directory.
+
+    Cloned once per module with hardlinks where possible, so tests must only
+    read it: writing through a link edits the fixture.
+    Skips when the fixture documents are not checked out.
+    """
+    source = Path(__file__).parent / "fixtures" / "subdir_test"
+    if not source.exists():
+        pytest.skip("Subdirectory test fixtures not available")
+    raw_dir = tmp_path_factory.mktemp("subdir_fixture") / "raw" / "test_provider"
+    shutil.copytree(source, raw_dir, copy_function=_link_or_copy)
+    return raw_dir
+
+
+@pytest.fixture
+def make_tree(tmp_path: Path):
+    """Return a builder for a per-test provider raw directory.
+
+    Takes the relative paths to create (see _write_tree) and returns the
+    raw directory, for tests that need a tree no shared fixture provides.
+    """
+
+    def build(files: list[str]) -> Path:
+        return _write_tree(tmp_path / "raw" / "test_provider", files)
+
+    return build
+
+
+@pytest.fixture(scope="module")
+def subdir_tree(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Provider raw directory with documents split across two subdirectories.
+
+    Shared by the whole module: tests must only read it.
+    """
+    return _write_tree(
+        tmp_path_factory.mktemp("subdir") / "raw" / "test_provider",
+        [
+            "Fees/fee1.pdf",
+            "Fees/fee2.pdf",
+            "Agreements/agreement1.pdf",
+            "Agreements/agreement2.docx",
+        ],
+    )
+
+
+@pytest.fixture(scope="module")
+def flat_tree(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Provider raw directory with two documents and no subdirectories.
+
+    Shared by the whole module: tests must only read it.
+    """
+    return _write_tree(
+        tmp_path_factory.mktemp("flat") / "raw" / "test_provider",
+        ["doc1.pdf", "doc2.pdf"],
+    )
+
+
+@pytest.fixture(scope="module")
+def nested_tree(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Provider raw directory with one document three levels deep.
+
+    Shared by the whole module: tests must only read it.
+    """
+    return _write_tree(
+        tmp_path_factory.mktemp("nested") / "raw" / "test_provider",
+        ["Level1/Level2/Level3/deep.pdf"],
+    )
+
+
+@pytest.fixture(scope="module")
+def extracted() -> ExtractedDocument:
+    """One-page extracted document shared by the artifact naming tests.
+
+    Artifact names come from the relative path passed alongside it, so the
+    same instance serves every subdirectory; tests must not modify it.
+    """
+    return ExtractedDocument(
+        source_file="agreement.pdf",
+        pages=[PageContent(page_num=1, text="Test content")],
+        page_count=1,
+        extraction_method="test",
+    )
+
+
+@pytest.fixture(scope="module")
+def long_extracted() -> ExtractedDocument:
+    """Extracted document long enough to split into chunks.
+
+    Shared by the chunk ID tests; chunk_document() only reads it.
+    """
+    return ExtractedDocument(
+        source_file="test.pdf",
+        pages=[PageContent(page_num=1, text=_LONG_FEES_TEXT)],
+        page_count=1,
+        extraction_method="test",
+    )
+
 
 class TestSubdirectoryDiscovery:
     """Test recursive file discovery across subdirectories."""
 
-    def test_rglob_finds_files_in_subdirectories(self, tmp_path):
-        """Verify rglob recursively discovers files in subdirectories."""
-        # Create subdirectory structure
-        fees_dir = tmp_path / "raw" / "test_provider" / "Fees"
-        agreements_dir = tmp_path / "raw" / "test_provider" / "Agreements"
-        fees_dir.mkdir(parents=True)
-        agreements_dir.mkdir(parents=True)
-
-        # Create test files
-        (fees_dir / "fee1.pdf").write_text("fee content")
-        (fees_dir / "fee2.pdf").write_text("fee content")
-        (agreements_dir / "agreement1.pdf").write_text("agreement content")
-        (agreements_dir / "agreement2.docx").write_text("agreement content")
-
-        # Test discovery
-        raw_dir = tmp_path / "raw" / "test_provider"
+    def test_finds_files_in_subdirectories(self, subdir_tree):
+        """Verify find_document_files recursively discovers files in subdirectories."""
         supported_extensions = {".pdf", ".docx"}
-        doc_files = sorted(
-            [
-                f
-                for f in raw_dir.rglob("*")
-                if f.is_file() and f.suffix.lower() in supported_extensions
-            ],
-            key=lambda p: p.relative_to(raw_dir).as_posix().lower(),
-        )
+        doc_files = find_document_files(subdir_tree, supported_extensions)
 
         assert len(doc_files) == 4
+        assert all(doc.path.is_file() for doc in doc_files)
         # Verify deterministic ordering by relative path
-        relative_paths = [f.relative_to(raw_dir).as_posix() for f in doc_files]
+        relative_paths = [str(doc.relative_path) for doc in doc_files]
         assert relative_paths == [
             "Agreements/agreement1.pdf",
             "Agreements/agreement2.docx",
@@ -49,70 +191,110 @@ class TestSubdirectoryDiscovery:
             "Fees/fee2.pdf",
         ]
 
-    def test_flat_structure_still_works(self, tmp_path):
+    def test_flat_structure_still_works(self, flat_tree):
         """Verify backward compatibility with flat directory structure."""
-        raw_dir = tmp_path / "raw" / "test_provider"
-        raw_dir.mkdir(parents=True)
+        supported_extensions = {".pdf", ".docx"}
+        doc_files = find_document_files(flat_tree, supported_extensions)
 
-        # Create test files in flat structure
-        (raw_dir / "doc1.pdf").write_text("content1")
-        (raw_dir / "doc2.pdf").write_text("content2")
+        assert [doc.path for doc in doc_files] == [
+            flat_tree / "doc1.pdf",
+            flat_tree / "doc2.pdf",
+        ]
+        assert [doc.relative_path for doc in doc_files] == [
+            PurePosixPath("doc1.pdf"),
+            PurePosixPath("doc2.pdf"),
+        ]
 
-        # Test discovery
+    def test_nested_subdirectories(self, nested_tree):
+        """Verify deeply nested subdirectories are discovered."""
         supported_extensions = {".pdf", ".docx"}
-        doc_files = sorted(
-            [
-                f
-                for f in raw_dir.rglob("*")
-                if f.is_file() and f.suffix.lower() in supported_extensions
-            ],
-            key=lambda p: p.relative_to(raw_dir).as_posix().lower(),
-        )
+        doc_files = find_document_files(nested_tree, supported_extensions)
 
-        assert len(doc_files) == 2
-        relative_paths = [f.relative_to(raw_dir).as_posix() for f in doc_files]
-        assert relative_paths == ["doc1.pdf", "doc2.pdf"]
+        assert len(doc_files) == 1
+        assert doc_files[0].path == nested_tree / "Level1/Level2/Level3/deep.pdf"
+        assert doc_files[0].relative_path == PurePosixPath(
+            "Level1/Level2/Level3/deep.pdf"
+        )
 
-    def test_nested_subdirectories(self, tmp_path):
-        """Verify deeply nested subdirectories are discovered."""
-        deep_dir = tmp_path / "raw" / "test_provider" / "Level1" / "Level2" / "Level3"
-        deep_dir.mkdir(parents=True)
-        (deep_dir / "deep.pdf").write_text("deep content")
+    def test_document_files_carry_relative_paths(self, subdir_tree):
+        """Verify each DocumentFile records its path relative to raw_dir."""
+        doc_files = find_document_files(subdir_tree, {".pdf", ".docx"})
 
-        raw_dir = tmp_path / "raw" / "test_provider"
-        supported_extensions = {".pdf", ".docx"}
-        doc_files = sorted(
-            [
-                f
-                for f in raw_dir.rglob("*")
-                if f.is_file() and f.suffix.lower() in supported_extensions
-            ],
-            key=lambda p: p.relative_to(raw_dir).as_posix().lower(),
+        assert doc_files[0] == DocumentFile(
+            subdir_tree / "Agreements" / "agreement1.pdf",
+            PurePosixPath("Agreements/agreement1.pdf"),
+            "Agreements/agreement1.pdf",
         )
+        for doc in doc_files:
+            assert doc.path.relative_to(subdir_tree).as_posix() == doc.document_path
+            assert str(doc.relative_path) == doc.document_path
 
-        assert len(doc_files) == 1
-        relative_path = doc_files[0].relative_to(raw_dir).as_posix()
-        assert relative_path == "Level1/Level2/Level3/deep.pdf"
+    def test_filters_extensions_case_insensitively(self, make_tree):
+        """Verify only supported suffixes are returned, in any case."""
+        raw_dir = make_tree(["upper.PDF", "notes.md", "Sub/noext", "Sub/fake.pdf/"])
+
+        doc_files = find_document_files(raw_dir, {".pdf", ".docx"})
+
+        assert [doc.path for doc in doc_files] == [raw_dir / "upper.PDF"]
+
+    def test_default_extensions_and_hidden_files(self, make_tree):
+        """Verify the default table includes .txt and dotfiles have no suffix."""
+        raw_dir = make_tree(["notes.txt", ".pdf"])
+
+        doc_files = find_document_files(raw_dir)
+
+        assert [doc.path for doc in doc_files] == [raw_dir / "notes.txt"]
+
+    def test_ordering_ignores_case(self, make_tree):
+        """Verify files sort by lowercased relative path, not raw byte order."""
+        raw_dir = make_tree(["Alpha.pdf", "beta/Zed.pdf", "Charlie.pdf"])
+
+        doc_files = find_document_files(raw_dir)
+
+        relative_paths = [str(doc.relative_path) for doc in doc_files]
+        assert relative_paths == ["Alpha.pdf", "beta/Zed.pdf", "Charlie.pdf"]
+
+    def test_directories_sort_as_path_prefixes(self, make_tree):
+        """Verify the walk orders files exactly as sorting full relative paths."""
+        files = ["a0.pdf", "a/x.pdf", "a.pdf", "a b.pdf"]
+        raw_dir = make_tree(files)
+
+        doc_files = find_document_files(raw_dir)
+
+        relative_paths = [str(doc.relative_path) for doc in doc_files]
+        assert relative_paths == sorted(files, key=str.lower)
+        assert relative_paths == ["a b.pdf", "a.pdf", "a/x.pdf", "a0.pdf"]
+
+    def test_unreadable_subdirectory_is_skipped(self, make_tree, monkeypatch):
+        """Verify a directory that cannot be listed is skipped, not fatal."""
+        raw_dir = make_tree(["Locked/secret.pdf", "Open/doc.pdf", "top.pdf"])
+        scandir = os.scandir
+
+        def guarded_scandir(path):
+            if os.path.basename(path) == "Locked":
+                raise PermissionError(13, "Permission denied", path)
+            return scandir(path)
+
+        # Patched rather than chmod'ed: root can list a mode-0 directory
+        monkeypatch.setattr("app.discovery.os.scandir", guarded_scandir)
+
+        doc_files = find_document_files(raw_dir)
+
+        assert [doc.document_path for doc in doc_files] == ["Open/doc.pdf", "top.pdf"]
 
 
 class TestArtifactNaming:
     """Test path-encoded artifact naming to prevent collisions."""
 
-    def test_extraction_artifact_path_encoding(self, tmp_path):
-        """Verify extraction artifacts use path encoding for subdirectories."""
-        # Create a mock extracted document using dataclass
-        from app.extract import ExtractedDocument
-        from app.extract import PageContent
-
-        extracted = ExtractedDocument(
-            source_file="test.pdf",
-            pages=[PageContent(page_num=1, text="Test content")],
-            page_count=1,
-            extraction_method="test",
-        )
+    def test_encode_relative_path(self):
+        """Verify subdirectory separators become __ and flat names pass through."""
+        assert encode_relative_path(_FEES_SCHEDULE) == "Fees__schedule.pdf"
+        assert encode_relative_path(PurePosixPath("schedule.pdf")) == "schedule.pdf"
 
+    def test_extraction_artifact_path_encoding(self, tmp_path, extracted):
+        """Verify extraction artifacts use path encoding for subdirectories."""
         output_dir = tmp_path / "text"
-        relative_path = Path("Fees/schedule.pdf")
+        relative_path = _FEES_SCHEDULE
 
         text_path, meta_path = save_extraction_artifacts(
             extracted, output_dir, "test_provider", relative_path
@@ -124,18 +306,8 @@ class TestArtifactNaming:
         assert text_path.exists()
         assert meta_path.exists()
 
-    def test_extraction_artifact_backward_compatibility(self, tmp_path):
+    def test_extraction_artifact_backward_compatibility(self, tmp_path, extracted):
         """Verify extraction artifacts work without relative_path (flat structure)."""
-        from app.extract import ExtractedDocument
-        from app.extract import PageContent
-
-        extracted = ExtractedDocument(
-            source_file="document.pdf",
-            pages=[PageContent(page_num=1, text="Test content")],
-            page_count=1,
-            extraction_method="test",
-        )
-
         output_dir = tmp_path / "text"
 
         # Call without relative_path (legacy behavior)
@@ -143,13 +315,11 @@ class TestArtifactNaming:
             extracted, output_dir, "test_provider"
         )
 
-        assert text_path.name == "document.pdf.txt"
-        assert meta_path.name == "document.pdf.meta.json"
+        assert text_path.name == "agreement.pdf.txt"
+        assert meta_path.name == "agreement.pdf.meta.json"
 
     def test_chunk_artifact_path_encoding(self, tmp_path):
         """Verify chunk artifacts use path encoding for subdirectories."""
-        from app.chunking import Chunk
-
         chunks = [
             Chunk(
                 text="Test chunk",
@@ -168,7 +338,7 @@ class TestArtifactNaming:
         ]
 
         output_dir = tmp_path / "chunks"
-        relative_path = Path("Agreements/license.pdf")
+        relative_path = _AGREEMENTS_LICENSE
 
         chunks_path, meta_path = save_chunks_artifacts(
             chunks, relative_path, output_dir
@@ -182,8 +352,6 @@ class TestArtifactNaming:
 
     def test_chunk_artifact_backward_compatibility(self, tmp_path):
         """Verify chunk artifacts work with string document_name (flat structure)."""
-        from app.chunking import Chunk
-
         chunks = [
             Chunk(
                 text="Test chunk",
@@ -215,28 +383,18 @@ class TestArtifactNaming:
 class TestCollisionPrevention:
     """Test that subdirectories prevent filename collisions."""
 
-    def test_same_filename_different_subdirs_no_collision(self, tmp_path):
+    def test_same_filename_different_subdirs_no_collision(self, tmp_path, extracted):
         """Verify same filename in different subdirectories creates distinct artifacts."""
-        from app.extract import ExtractedDocument
-        from app.extract import PageContent
-
-        extracted = ExtractedDocument(
-            source_file="agreement.pdf",
-            pages=[PageContent(page_num=1, text="Test content")],
-            page_count=1,
-            extraction_method="test",
-        )
-
         output_dir = tmp_path / "text"
 
         # Save from Fees subdirectory
         text_path1, _ = save_extraction_artifacts(
-            extracted, output_dir, "test", Path("Fees/agreement.pdf")
+            extracted, output_dir, "test", _FEES_AGREEMENT
         )
 
         # Save from Agreements subdirectory (same filename)
         text_path2, _ = save_extraction_artifacts(
-            extracted, output_dir, "test", Path("Agreements/agreement.pdf")
+            extracted, output_dir, "test", _AGREEMENTS_AGREEMENT
         )
 
         # Verify distinct artifacts
@@ -249,30 +407,13 @@ class TestCollisionPrevention:
 class TestChunkIDUniqueness:
     """Test chunk IDs include encoded paths for uniqueness."""
 
-    def test_chunk_ids_include_relative_path(self):
+    def test_chunk_ids_include_relative_path(self, long_extracted):
         """Verify chunk IDs use encoded relative path to ensure uniqueness."""
-        from app.extract import ExtractedDocument
-        from app.extract import PageContent
-
-        # Create longer text that will actually chunk
-        text = "Section 1: Fees and Charges\n\n" + " ".join(
-            ["This is test content."] * 50
-        )
-
-        extracted = ExtractedDocument(
-            source_file="test.pdf",
-            pages=[PageContent(page_num=1, text=text)],
-            page_count=1,
-            extraction_method="test",
-        )
-
-        relative_path = Path("Fees/schedule.pdf")
-
         chunks = chunk_document(
-            extracted,
+            long_extracted,
             source="test_provider",
             document_version="v1",
-            relative_path=relative_path,
+            relative_path=_FEES_SCHEDULE,
         )
 
         # Verify chunk IDs use encoded path
@@ -281,26 +422,11 @@ class TestChunkIDUniqueness:
             assert "Fees__schedule.pdf" in chunk.chunk_id
             assert chunk.chunk_id.startswith("test_provider_Fees__schedule.pdf_")
 
-    def test_chunk_ids_backward_compatible(self):
+    def test_chunk_ids_backward_compatible(self, long_extracted):
         """Verify chunk IDs work without relative_path (flat structure)."""
-        from app.extract import ExtractedDocument
-        from app.extract import PageContent
-
-        # Create longer text that will actually chunk
-        text = "Section 1: Overview\n\n" + " ".join(
-            ["This is test document content."] * 50
-        )
-
-        extracted = ExtractedDocument(
-            source_file="test.pdf",
-            pages=[PageContent(page_num=1, text=text)],
-            page_count=1,
-            extraction_method="test",
-        )
-
         # Call without relative_path
         chunks = chunk_document(
-            extracted,
+            long_extracted,
             source="test_provider",
             document_version="v1",
         )
@@ -313,40 +439,18 @@ class TestChunkIDUniqueness:
 class TestEndToEndSubdirectories:
     """End-to-end tests with real fixture files in subdirectories."""
 
-    def test_deterministic_ordering_across_subdirs(self, tmp_path):
+    def test_deterministic_ordering_across_subdirs(self, subdir_fixture_tree):
         """Verify ingestion order is deterministic across subdirectories."""
-        fixtures_dir = Path(__file__).parent / "fixtures" / "subdir_test"
-
-        if not fixtures_dir.exists():
-            pytest.skip("Subdirectory test fixtures not available")
-
-        raw_dir = tmp_path / "raw" / "test_provider"
-        shutil.copytree(fixtures_dir, raw_dir)
-
         # Find files twice
         supported_extensions = {".pdf", ".docx"}
 
-        files1 = sorted(
-            [
-                f
-                for f in raw_dir.rglob("*")
-                if f.is_file() and f.suffix.lower() in supported_extensions
-            ],
-            key=lambda p: p.relative_to(raw_dir).as_posix().lower(),
-        )
+        files1 = find_document_files(subdir_fixture_tree, supported_extensions)
 
-        files2 = sorted(
-            [
-                f
-                for f in raw_dir.rglob("*")
-                if f.is_file() and f.suffix.lower() in supported_extensions
-            ],
-            key=lambda p: p.relative_to(raw_dir).as_posix().lower(),
-        )
+        files2 = find_document_files(subdir_fixture_tree, supported_extensions)
 
         # Verify identical ordering
         assert files1 == files2
 
         # Verify alphabetical by relative path
-        rel_paths = [f.relative_to(raw_dir).as_posix() for f in files1]
+        rel_paths = [str(doc.relative_path) for doc in files1]
         assert rel_paths == sorted(rel_paths)
@@ -1,17 +1,42 @@
 # tests/test_validate.py
 """Tests for LLM output validation."""
 
+import pytest
+
 from app.validate import ValidationResult
 from app.validate import get_stricter_system_prompt
 from app.validate import validate_llm_output
 
+# Sections of a minimal well-formed answer; tests join the subset they need
+_ANSWER_SECTION = "## Answer\nThe fee is $500 per month.\n"
+_SUPPORTING_SECTION = """## Supporting Clauses
+> "Fee: $500/month"
+> — [CME] Fee List, Page 5
+"""
+_CITATIONS_SECTION = "## Citations\n- **[CME] Fee List** (Page 5): Section 2.1\n"
+_SHORT_ANSWER = f"{_ANSWER_SECTION}\n{_SUPPORTING_SECTION}\n{_CITATIONS_SECTION}"
+
+# Canonical refusals
+_REFUSAL_CME = "## Answer\nThis is not addressed in the provided CME documents.\n"
+_REFUSAL_CME_OPRA = (
+    "## Answer\nThis is not addressed in the provided CME, OPRA documents.\n"
+)
 
-class TestValidateAnswer:
-    """Tests for validating properly formatted answers."""
 
-    def test_valid_answer_passes(self):
-        """Valid answer with all required sections should pass."""
-        output = """## Answer
+# Errors for an answer lacking a required section
+_MISSING_ANSWER = "Missing required '## Answer' section for answer"
+_MISSING_SUPPORTING = "Missing required '## Supporting Clauses' section for answer"
+_MISSING_CITATIONS = "Missing required '## Citations' section for answer"
+
+
+def _err_has(result: ValidationResult, *needles: str) -> bool:
+    """Return True if every needle occurs in the joined validation errors."""
+    joined = "\n".join(result.errors)
+    return all(needle in joined for needle in needles)
+
+
+# Full answer with an optional Notes section
+_FULL_ANSWER = """## Answer
 The fee for real-time data is $500 per month according to the CME fee schedule.
 
 ## Supporting Clauses
@@ -24,212 +49,230 @@ The fee for real-time data is $500 per month according to the CME fee schedule.
 ## Notes
 - This fee applies to professional users only
 """
-        result = validate_llm_output(output, ["cme"])
-
-        assert result.is_valid
-        assert not result.is_refusal
-        assert len(result.errors) == 0
-
-    def test_answer_missing_supporting_clauses(self):
-        """Answer missing Supporting Clauses section should fail."""
-        output = """## Answer
-The fee is $500 per month.
-
-## Citations
-- **[CME] Fee List** (Page 5): Data Fees
-"""
-        result = validate_llm_output(output, ["cme"])
-
-        assert not result.is_valid
-        assert not result.is_refusal
-        assert any("Supporting Clauses" in error for error in result.errors)
-
-    def test_answer_missing_citations(self):
-        """Answer missing Citations section should fail."""
-        output = """## Answer
-The fee is $500 per month.
-
-## Supporting Clauses
-> "Fee: $500/month"
-> — [CME] Fee List, Page 5
-"""
-        result = validate_llm_output(output, ["cme"])
 
-        assert not result.is_valid
-        assert not result.is_refusal
-        assert any("Citations" in error for error in result.errors)
-
-    def test_answer_missing_answer_section(self):
-        """Answer missing Answer section header should fail."""
-        output = """The fee is $500 per month.
-
-## Supporting Clauses
-> "Fee: $500/month"
-> — [CME] Fee List, Page 5
-
-## Citations
-- **[CME] Fee List** (Page 5): Data Fees
-"""
-        result = validate_llm_output(output, ["cme"])
-
-        assert not result.is_valid
-        assert any("Answer" in error for error in result.errors)
-
-    def test_answer_with_page_numbers_no_warnings(self):
-        """Answer with proper page numbers should have no warnings."""
-        output = """## Answer
-The fee is $500 per month.
-
-## Supporting Clauses
-> "Fee: $500/month"
-> — [CME] Fee List, Page 5
-
-## Citations
+# Citations with a page range; the first line optionally drops its page
+_PAGED_CITATIONS = """## Citations
 - **[CME] Market Data Fee List** (Page 5): Section 2.1
 - **[CME] Terms and Conditions** (Pages 10-12): Vendor Obligations
 """
-        result = validate_llm_output(output, ["cme"])
+_UNPAGED_CITATIONS = _PAGED_CITATIONS.replace(" (Page 5)", "", 1)
+
+
+def _assert_result(
+    result: ValidationResult,
+    expect_valid: bool,
+    expect_refusal: bool,
+    error_substrings: tuple[str, ...],
+    warning_substrings: tuple[str, ...] | None,
+) -> None:
+    """Check a ValidationResult against one row of a validation table.
+
+    warning_substrings of None skips the warning check; an empty tuple
+    requires no warnings at all.
+    """
+    assert result.is_valid is expect_valid
+    assert result.is_refusal is expect_refusal
+    if expect_valid:
+        assert result.errors == []
+    else:
+        assert result.errors
+        assert _err_has(result, *error_substrings)
+    if warning_substrings is not None:
+        joined = "\n".join(result.warnings).lower()
+        assert all(needle in joined for needle in warning_substrings)
+        assert bool(result.warnings) == bool(warning_substrings)
+
+
+_TABLE_FIELDS = (
+    "output,sources,expect_valid,expect_refusal,error_substrings,warning_substrings"
+)
 
-        assert result.is_valid
-        assert len(result.warnings) == 0
-
-    def test_answer_missing_page_numbers_warns(self):
-        """Answer with citations missing page numbers should warn."""
-        output = """## Answer
-The fee is $500 per month.
 
-## Supporting Clauses
-> "Fee: $500/month"
-> — [CME] Fee List, Page 5
-
-## Citations
-- **[CME] Market Data Fee List**: Section 2.1
-- **[CME] Terms and Conditions** (Pages 10-12): Vendor Obligations
-"""
-        result = validate_llm_output(output, ["cme"])
+class TestValidateAnswer:
+    """Tests for validating properly formatted answers."""
 
-        assert result.is_valid  # Warnings don't make it invalid
-        assert len(result.warnings) > 0
-        assert any("page number" in warning.lower() for warning in result.warnings)
+    @pytest.mark.parametrize(
+        _TABLE_FIELDS,
+        [
+            pytest.param(
+                _FULL_ANSWER, ["cme"], True, False, (), None, id="valid_answer"
+            ),
+            pytest.param(
+                f"{_ANSWER_SECTION}\n{_CITATIONS_SECTION}",
+                ["cme"],
+                False,
+                False,
+                (_MISSING_SUPPORTING,),
+                None,
+                id="missing_supporting_clauses",
+            ),
+            pytest.param(
+                f"{_ANSWER_SECTION}\n{_SUPPORTING_SECTION}",
+                ["cme"],
+                False,
+                False,
+                (_MISSING_CITATIONS,),
+                None,
+                id="missing_citations",
+            ),
+            pytest.param(
+                _SHORT_ANSWER.removeprefix("## Answer\n"),
+                ["cme"],
+                False,
+                False,
+                (_MISSING_ANSWER,),
+                None,
+                id="missing_answer_section",
+            ),
+            pytest.param(
+                f"{_ANSWER_SECTION}\n{_SUPPORTING_SECTION}\n{_PAGED_CITATIONS}",
+                ["cme"],
+                True,
+                False,
+                (),
+                (),
+                id="page_numbers_no_warnings",
+            ),
+            # Warnings don't make the answer invalid
+            pytest.param(
+                f"{_ANSWER_SECTION}\n{_SUPPORTING_SECTION}\n{_UNPAGED_CITATIONS}",
+                ["cme"],
+                True,
+                False,
+                (),
+                ("page number",),
+                id="missing_page_numbers_warns",
+            ),
+        ],
+    )
+    def test_validate_answer(
+        self,
+        output,
+        sources,
+        expect_valid,
+        expect_refusal,
+        error_substrings,
+        warning_substrings,
+    ):
+        """Answers pass only with Answer, Supporting Clauses and Citations."""
+        result = validate_llm_output(output, sources)
+
+        _assert_result(
+            result, expect_valid, expect_refusal, error_substrings, warning_substrings
+        )
 
 
 class TestValidateRefusal:
     """Tests for validating refusal responses."""
 
-    def test_valid_refusal_single_source(self):
-        """Valid refusal for single source should pass."""
-        output = """## Answer
-This is not addressed in the provided CME documents. The fee schedule does not include pricing for derivative products.
-
-## Notes
-- The available documents only cover spot market data fees
-"""
-        result = validate_llm_output(output, ["cme"])
-
-        assert result.is_valid
-        assert result.is_refusal
-        assert len(result.errors) == 0
-
-    def test_valid_refusal_multiple_sources(self):
-        """Valid refusal for multiple sources should pass."""
-        output = """## Answer
-This is not addressed in the provided CME, OPRA documents. The fee schedules do not specify requirements for non-display usage.
-"""
-        result = validate_llm_output(output, ["cme", "opra"])
-
-        assert result.is_valid
-        assert result.is_refusal
-        assert len(result.errors) == 0
-
-    def test_refusal_with_supporting_clauses_fails(self):
-        """Refusal should not include Supporting Clauses section."""
-        output = """## Answer
-This is not addressed in the provided CME documents.
-
-## Supporting Clauses
-> "Some quote here"
-> — [CME] Document, Page 5
-"""
-        result = validate_llm_output(output, ["cme"])
-
-        assert not result.is_valid
-        assert result.is_refusal
-        assert any(
-            "Supporting Clauses" in error and "omitted" in error
-            for error in result.errors
+    @pytest.mark.parametrize(
+        _TABLE_FIELDS,
+        [
+            pytest.param(
+                _REFUSAL_CME.rstrip("\n")
+                + " The fee schedule does not include pricing for derivative"
+                " products.\n\n## Notes\n"
+                "- The available documents only cover spot market data fees\n",
+                ["cme"],
+                True,
+                True,
+                (),
+                None,
+                id="valid_single_source",
+            ),
+            pytest.param(
+                _REFUSAL_CME_OPRA.rstrip("\n")
+                + " The fee schedules do not specify requirements for non-display"
+                " usage.\n",
+                ["cme", "opra"],
+                True,
+                True,
+                (),
+                None,
+                id="valid_multiple_sources",
+            ),
+            pytest.param(
+                f"{_REFUSAL_CME}\n{_SUPPORTING_SECTION}",
+                ["cme"],
+                False,
+                True,
+                ("Supporting Clauses section should be omitted when refusing",),
+                None,
+                id="supporting_clauses_fails",
+            ),
+            # Not detected as a refusal, so it fails as an answer missing
+            # Supporting Clauses and Citations
+            pytest.param(
+                "## Answer\n"
+                "I cannot answer this question based on the provided documents.\n",
+                ["cme"],
+                False,
+                False,
+                (_MISSING_SUPPORTING, _MISSING_CITATIONS),
+                None,
+                id="wrong_format_fails",
+            ),
+            # Doesn't match "CME documents", so it is checked as an answer
+            pytest.param(
+                "## Answer\nThis is not addressed in the provided documents.\n",
+                ["cme"],
+                False,
+                False,
+                (_MISSING_SUPPORTING, _MISSING_CITATIONS),
+                None,
+                id="missing_provider_name",
+            ),
+            # Asking about CME but refusal says OPRA, so it is checked as an
+            # answer
+            pytest.param(
+                "## Answer\nThis is not addressed in the provided OPRA documents.\n",
+                ["cme"],
+                False,
+                False,
+                (_MISSING_SUPPORTING, _MISSING_CITATIONS),
+                None,
+                id="wrong_provider_name",
+            ),
+        ],
+    )
+    def test_validate_refusal(
+        self,
+        output,
+        sources,
+        expect_valid,
+        expect_refusal,
+        error_substrings,
+        warning_substrings,
+    ):
+        """Refusals pass only in canonical form and without Supporting Clauses."""
+        result = validate_llm_output(output, sources)
+
+        _assert_result(
+            result, expect_valid, expect_refusal, error_substrings, warning_substrings
         )
 
-    def test_refusal_wrong_format_fails(self):
-        """Refusal with incorrect format should fail."""
-        output = """## Answer
-I cannot answer this question based on the provided documents.
-"""
-        result = validate_llm_output(output, ["cme"])
-
-        # This is not detected as refusal (wrong format), so it's treated as answer
-        # and fails because it's missing Supporting Clauses and Citations
-        assert not result.is_valid
-        assert not result.is_refusal
-        # Should fail validation because answer is missing required sections
-        assert len(result.errors) > 0
-
-    def test_refusal_missing_provider_name(self):
-        """Refusal without provider name should fail."""
-        output = """## Answer
-This is not addressed in the provided documents.
-"""
-        result = validate_llm_output(output, ["cme"])
-
-        assert not result.is_valid
-        # Should fail because it doesn't match "CME documents"
-
-    def test_refusal_wrong_provider_name(self):
-        """Refusal with wrong provider name should fail."""
-        output = """## Answer
-This is not addressed in the provided OPRA documents.
-"""
-        result = validate_llm_output(output, ["cme"])
-
-        # Asking about CME but refusal says OPRA
-        assert not result.is_valid
-
 
 class TestRefusalDetection:
     """Tests for detecting whether output is refusal or answer."""
 
-    def test_detects_refusal_single_source(self):
-        """Should detect refusal for single source."""
-        output = """## Answer
-This is not addressed in the provided CME documents.
-"""
-        result = validate_llm_output(output, ["cme"])
-
-        assert result.is_refusal
-
-    def test_detects_refusal_multiple_sources(self):
-        """Should detect refusal for multiple sources."""
-        output = """## Answer
-This is not addressed in the provided CME, OPRA, CTA documents.
-"""
-        result = validate_llm_output(output, ["cme", "opra", "cta"])
-
-        assert result.is_refusal
-
-    def test_detects_answer_not_refusal(self):
-        """Should not detect answer as refusal."""
-        output = """## Answer
-The fee is $500 per month.
-
-## Supporting Clauses
-> "Fee: $500/month"
-> — [CME] Fee List, Page 5
-
-## Citations
-- **[CME] Fee List** (Page 5): Section 2.1
-"""
-        result = validate_llm_output(output, ["cme"])
-
-        assert not result.is_refusal
+    @pytest.mark.parametrize(
+        "output,sources,expect_refusal",
+        [
+            (_REFUSAL_CME, ["cme"], True),
+            (
+                _REFUSAL_CME.replace("CME", "CME, OPRA, CTA"),
+                ["cme", "opra", "cta"],
+                True,
+            ),
+            (_SHORT_ANSWER, ["cme"], False),
+        ],
+        ids=["single_source", "multiple_sources", "answer"],
+    )
+    def test_detects_refusal(self, output, sources, expect_refusal):
+        """Should detect refusals for one or several sources, and not answers."""
+        result = validate_llm_output(output, sources)
+
+        assert result.is_refusal is expect_refusal
 
 
 class TestStricterSystemPrompt:
@@ -328,6 +371,8 @@ class TestEdgeCases:
         result = validate_llm_output("   \n\n   ", ["cme"])
 
         assert not result.is_valid
+        assert not result.is_refusal
+        assert _err_has(result, "Answer", "Supporting Clauses", "Citations")
 
     def test_malformed_sections(self):
         """Malformed section headers should fail validation."""
@@ -340,14 +385,11 @@ Some text here
         result = validate_llm_output(output, ["cme"])
 
         assert not result.is_valid
-        assert any("Answer" in error for error in result.errors)
+        assert _err_has(result, "Answer")
 
     def test_multiple_sources_validation(self):
         """Should validate refusal format with multiple sources correctly."""
-        output = """## Answer
-This is not addressed in the provided CME, OPRA documents.
-"""
-        result = validate_llm_output(output, ["cme", "opra"])
+        result = validate_llm_output(_REFUSAL_CME_OPRA, ["cme", "opra"])
 
         assert result.is_valid
         assert result.is_refusal
@@ -355,10 +397,7 @@ This is not addressed in the provided CME, OPRA documents.
     def test_case_sensitivity_provider_names(self):
         """Provider names should be case-insensitive in validation."""
         # Validator expects uppercase in canonical format
-        output = """## Answer
-This is not addressed in the provided CME documents.
-"""
-        result = validate_llm_output(output, ["cme"])  # lowercase input
+        result = validate_llm_output(_REFUSAL_CME, ["cme"])  # lowercase input
 
         assert result.is_valid
         assert result.is_refusal